@@ -0,0 +1,118 @@
+#
+#
+#  Host side helper to run many cocotb simulations (sweep points) in parallel.
+#
+#  Each sweep point is a 'make -f' of the Makefile in this directory with its own
+#  environment, results.xml and log file, run in its own directory under workdir so the
+#  files the simulator and test write to the current directory can not collide.  The
+#  simulator build (SIM_BUILD) is shared, so it is built once by build() before the
+#  points are dispatched across a process pool.
+#
+#  A sweep point can return data to the host by writing JSON to the file named by the
+#  SWEEP_RESULT_FILE environment variable, this is loaded into the 'result' key.
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import os
+import json
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Must be module level to be picklable for the ProcessPoolExecutor
+def run_point(make_args: list, cwd: str, workdir: str, name: str, env: dict) -> dict:
+    xml_file = os.path.join(workdir, f"{name}.xml")
+    log_file = os.path.join(workdir, f"{name}.log")
+    result_file = os.path.join(workdir, f"{name}.json")
+
+    for f in [xml_file, result_file]:
+        if os.path.exists(f):
+            os.remove(f)
+
+    point_dir = os.path.join(workdir, name)
+    os.makedirs(point_dir, exist_ok=True)
+
+    penv = dict(os.environ)
+    penv.update(dict(map(lambda kv: (kv[0], str(kv[1])), env.items())))
+    penv['COCOTB_RESULTS_FILE'] = xml_file
+    penv['SWEEP_RESULT_FILE'] = result_file
+    # the Makefile finds the sources from $(PWD), the test module is imported from cwd
+    penv['PWD'] = cwd
+    penv['PYTHONPATH'] = os.pathsep.join(filter(None, [cwd, os.environ.get('PYTHONPATH')]))
+
+    with open(log_file, 'w') as log:
+        rc = subprocess.run(make_args, cwd=point_dir, env=penv, stdout=log, stderr=subprocess.STDOUT).returncode
+
+    # make will return success even if the test fails, so check for failure in the results.xml
+    passed = False
+    if rc == 0 and os.path.exists(xml_file):
+        with open(xml_file) as f:
+            passed = 'failure' not in f.read()
+
+    result = None
+    if os.path.exists(result_file):
+        with open(result_file) as f:
+            result = json.load(f)
+
+    return {
+        'name': name,
+        'env': env,
+        'returncode': rc,
+        'passed': passed,
+        'result': result,
+        'log': log_file
+    }
+
+
+class SweepRunner():
+    def __init__(self, module: str, workdir: str = None, sim: str = None, gates: bool = False, max_workers: int = None, testcase: str = None) -> None:
+        self.cwd = os.path.dirname(os.path.abspath(__file__))
+        self.module = module
+        self.workdir = os.path.abspath(workdir if workdir else os.path.join(self.cwd, 'sweep_build', module))
+        self.sim = sim if sim else os.environ.get('SIM', 'icarus')
+        self.gates = gates
+        self.max_workers = max_workers
+        self.testcase = testcase
+        os.makedirs(self.workdir, exist_ok=True)
+        return None
+
+    def make_args(self) -> list:
+        sim_build = os.path.join(self.workdir, 'sim_build')
+        args = ['make', '-f', os.path.join(self.cwd, 'Makefile'), f"SIM={self.sim}", f"MODULE={self.module}", f"SIM_BUILD={sim_build}", 'VCD=no']
+        if self.gates:
+            args.append('GATES=yes')
+        if self.testcase:
+            args.append(f"TESTCASE={self.testcase}")
+        return args
+
+    # Build the simulation once (by running a single point), so the parallel points
+    #  only need to run the simulator
+    def build(self, env: dict = None) -> dict:
+        return run_point(self.make_args(), self.cwd, self.workdir, '_build', env if env else {})
+
+    def run(self, name: str, env: dict) -> dict:
+        return run_point(self.make_args(), self.cwd, self.workdir, name, env)
+
+    # points: list of (name, env) tuples
+    def run_all(self, points: list, progress = None) -> list:
+        make_args = self.make_args()
+        results = []
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = []
+            for (name, env) in points:
+                futures.append(pool.submit(run_point, make_args, self.cwd, self.workdir, name, env))
+            for future in futures:
+                r = future.result()
+                if progress:
+                    progress(r)
+                results.append(r)
+        return results
+
+
+__all__ = [
+    'SweepRunner',
+    'run_point'
+]
@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+#
+#
+#  binary_value_bit / extract_bit / change_bit cost per call, no simulator needed.
+#
+#  The handle is a ModifiableObject subclass that stores the value and makes a new
+#  BinaryValue on every read, so this measures the Python side only.  'legacy' are the previous string slicing versions (with the
+#  debug strings built on every call) for comparison.
+#
+#  ./bench_cocotbutil_bits.py
+#  ./bench_cocotbutil_bits.py --number 200000
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import sys
+import timeit
+import argparse
+
+from cocotb.binary import BinaryValue
+from cocotb.handle import ModifiableObject
+
+from cocotb_stuff.cocotbutil import *
+from cocotb_stuff.cocotbutil import binary_value_bit
+
+
+# Like a simulator handle a write just stores and every read makes a new BinaryValue
+class BenchHandle(ModifiableObject):
+    def __init__(self, value: str) -> None:
+        self._n_bits = len(value)
+        self._value = value
+
+    @property
+    def value(self) -> BinaryValue:
+        v = self._value
+        if isinstance(v, BinaryValue):
+            v = v.binstr
+        elif isinstance(v, int):
+            v = format(v, f"0{self._n_bits}b")
+        return BinaryValue(v, n_bits=self._n_bits)
+
+    @value.setter
+    def value(self, v) -> None:
+        self._value = v
+
+
+def legacy_binary_value_bit(bv: BinaryValue, bitid: int, value = None) -> tuple:
+    s = bv.binstr
+    biti = bitid+1
+    if biti > bv.n_bits:
+        raise Exception(f"{biti} > {bv.n_bits} from {bv}")
+    msb = s[:-(biti)]
+    lsb = s[-(biti-1):]
+    p = s[-(biti)]
+    dbg1 = "{} {} {}".format(s[-(biti+1)], s[-(biti)], s[-(biti-1)]) if(bv.n_bits > bitid+1) else "small={}".format(bv.n_bits)
+    dbg2 = "{} {} {} {}".format(dbg1, msb, p, lsb)
+    if value is not None:
+        bitstr = ('1' if(value) else '0') if isinstance(value, bool) else str(value)
+        nv = BinaryValue(msb + bitstr + lsb, n_bits=bv.n_bits)
+    else:
+        nv = bv
+    return (nv, p == '1', p)
+
+
+def legacy_extract_bit(v, bitid: int) -> bool:
+    if type(v) is int:
+        v = BinaryValue(v, n_bits=v.bit_length())
+    return legacy_binary_value_bit(v, bitid)[1]
+
+
+def legacy_change_bit(signal, bitid: int, bf: bool) -> bool:
+    (nbv, mv, sv) = legacy_binary_value_bit(signal.value, bitid, bf)
+    signal.value = nbv
+    return mv
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description='cocotbutil bit helper cost per call (no simulator)')
+    parser.add_argument('--number', type=int, default=100000, help='calls per case')
+    parser.add_argument('--repeat', type=int, default=3, help='best of')
+    args = parser.parse_args(argv)
+
+    bv = BinaryValue('00001100', n_bits=8)
+    xz_bv = BinaryValue('xxxx1z00', n_bits=8)
+    handle = BenchHandle('00001100')
+    xz_handle = BenchHandle('xxxx1z00')
+
+    toggle = [False]
+    def flip(fn):
+        def f():
+            toggle[0] = not toggle[0]
+            fn(toggle[0])
+        return f
+
+    cases = [
+        ('binary_value_bit get',        lambda: binary_value_bit(bv, 3)),
+        ('legacy binary_value_bit get', lambda: legacy_binary_value_bit(bv, 3)),
+        ('binary_value_bit get x/z',    lambda: binary_value_bit(xz_bv, 3)),
+        ('binary_value_bit set',        flip(lambda b: binary_value_bit(bv, 3, b))),
+        ('legacy binary_value_bit set', flip(lambda b: legacy_binary_value_bit(bv, 3, b))),
+        ('extract_bit BinaryValue',     lambda: extract_bit(bv, 3)),
+        ('extract_bit int',             lambda: extract_bit(0x0c, 3)),
+        ('legacy extract_bit int',      lambda: legacy_extract_bit(0x0c, 3)),
+        ('change_bit',                  flip(lambda b: change_bit(handle, 3, b))),
+        ('change_bit x/z',              flip(lambda b: change_bit(xz_handle, 3, b))),
+        ('legacy change_bit',           flip(lambda b: legacy_change_bit(handle, 3, b))),
+        ('legacy change_bit x/z',       flip(lambda b: legacy_change_bit(xz_handle, 3, b)))
+    ]
+
+    print(f"{'case':28s} {'ns/call':>10s}   ({args.number} calls, best of {args.repeat})")
+    for (name, fn) in cases:
+        best = min(timeit.repeat(fn, number=args.number, repeat=args.repeat))
+        print(f"{name:28s} {best * 1e9 / args.number:10.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
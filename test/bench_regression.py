@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+#
+#
+#  Full simulation throughput regression gate with a stored baseline.
+#
+#  Runs test_i2c_bert.py at the reference configs (CYCLES_PER_BIT x SCL_MODE, RTL on each
+#  --sim) one at a time, so the runs do not compete for the CPU, and collects the
+#  THROUGHPUT figures the test writes to SWEEP_RESULT_FILE:
+#
+#   cycles_per_s     dut.clk cycles simulated per wall second
+#   bytes_per_s      I2C bytes transferred per wall second
+#   wakeups_per_bit  Python coroutine resumes per I2C bit
+#
+#  --compare fails (exit 1) when cycles_per_s or bytes_per_s drop, or wakeups_per_bit
+#  rises, by more than --threshold percent against the baseline.  A failed run is always
+#  a failure, so is a config the baseline has no figures for (a baseline with no results
+#  is refused before anything is run) unless --allow-new is given.  --update-baseline
+#  writes the results as the new baseline, there is no baseline in the tree as the
+#  figures are per host, measure one first.
+#
+#  PROFILE and INSTRUMENT are turned off for the runs even when set in the environment,
+#  a point that still reports itself as instrumented is a failure.
+#
+#  The wall clock figures are only meaningful against a baseline measured on the same
+#  machine (the host is recorded in the file), wakeups_per_bit does not depend on the
+#  host so it is the figure to look at first when cocotb_stuff gets slower.
+#
+#  ./bench_regression.py --update-baseline bench_sim_baseline.json
+#  ./bench_regression.py --compare bench_sim_baseline.json
+#  ./bench_regression.py --sim icarus --cycles-per-bit 25 --scl-mode 0 --compare bench_sim_baseline.json
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import os
+import sys
+import json
+import argparse
+import platform
+
+from SweepRunner import *
+
+
+BASELINE_VERSION = 1
+
+SIMS = ['icarus', 'verilator']
+CYCLES_PER_BITS = [3, 25, 100]
+SCL_MODES = [0, 5]
+
+# Passed to every run, so an inherited PROFILE/INSTRUMENT does not slow the figures down
+RUN_ENV = {
+    'PROFILE': 'false',
+    'INSTRUMENT': 'false'
+}
+
+# metric => True when higher is better
+METRICS = {
+    'cycles_per_s': True,
+    'bytes_per_s': True,
+    'wakeups_per_bit': False
+}
+
+
+def point_name(sim: str, cycles_per_bit: float, scl_mode: int) -> str:
+    return f"{sim}_cpb{cycles_per_bit:g}_mode{scl_mode}"
+
+
+def host() -> dict:
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(), 'machine': platform.machine(), 'system': platform.system()}
+
+
+# {name: {metric: value}} or {name: None} when the run failed
+def run(sims: list, cycles_per_bits: list, scl_modes: list, progress = None) -> dict:
+    results = {}
+    for sim in sims:
+        workdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sweep_build', 'bench_regression', sim)
+        runner = SweepRunner('test_i2c_bert', workdir=workdir, sim=sim)
+        print(f"Building {sim} in {runner.workdir} ...")
+        build = runner.build(dict(RUN_ENV, CYCLES_PER_BIT=cycles_per_bits[0], SCL_MODE=scl_modes[0]))
+        if build['returncode'] != 0:
+            print(f"Build failed, see {build['log']}")
+            for cycles_per_bit in cycles_per_bits:
+                for scl_mode in scl_modes:
+                    results[point_name(sim, cycles_per_bit, scl_mode)] = None
+            continue
+        for cycles_per_bit in cycles_per_bits:
+            for scl_mode in scl_modes:
+                name = point_name(sim, cycles_per_bit, scl_mode)
+                r = runner.run(name, dict(RUN_ENV, CYCLES_PER_BIT=cycles_per_bit, SCL_MODE=scl_mode))
+                if not r['passed'] or r['result'] is None:
+                    results[name] = None
+                    print(f"  {name} FAIL see {r['log']}")
+                    continue
+                if r['result']['config'].get('instrumented'):
+                    results[name] = None
+                    print(f"  {name} FAIL ran with PROFILE or INSTRUMENT, see {r['log']}")
+                    continue
+                throughput = r['result']['throughput']
+                results[name] = dict(map(lambda m: (m, throughput[m]), METRICS.keys()))
+                if progress:
+                    progress(name, results[name])
+    return results
+
+
+# [(name, metric, value, baseline, change_percent, regressed)] change is +ve when worse,
+#  a figure missing from the baseline is a regression unless allow_new
+def compare(results: dict, baseline: dict, threshold: float, allow_new: bool = False) -> list:
+    rows = []
+    for (name, metrics) in results.items():
+        if metrics is None:
+            rows.append((name, None, None, None, None, True))
+            continue
+        base = baseline.get(name)
+        for (metric, higher_is_better) in METRICS.items():
+            value = metrics[metric]
+            base_value = base.get(metric) if base is not None else None
+            if base_value is None or base_value <= 0:
+                rows.append((name, metric, value, None, None, not allow_new))
+                continue
+            change = (base_value - value if higher_is_better else value - base_value) * 100 / base_value
+            rows.append((name, metric, value, base_value, change, change > threshold))
+    return rows
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description='Full simulation throughput regression gate with a stored baseline')
+    parser.add_argument('--sim', action='append', help=f"simulator to run (default: {' '.join(SIMS)})")
+    parser.add_argument('--cycles-per-bit', type=float, action='append', help=f"CYCLES_PER_BIT to run (default: {' '.join(map(str, CYCLES_PER_BITS))})")
+    parser.add_argument('--scl-mode', type=int, action='append', help=f"SCL_MODE to run (default: {' '.join(map(str, SCL_MODES))})")
+    parser.add_argument('--compare', default=None, metavar='FILE', help='compare with the baseline')
+    parser.add_argument('--update-baseline', default=None, metavar='FILE', help='write the results as the baseline (entries not run are kept)')
+    parser.add_argument('--allow-new', action='store_true', help='--compare passes configs the baseline has no figures for')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent worse than the baseline that is a regression')
+    parser.add_argument('--json', default=None, help='write the results to this file')
+    args = parser.parse_args(argv)
+
+    sims = args.sim if args.sim else SIMS
+    cycles_per_bits = args.cycles_per_bit if args.cycles_per_bit else CYCLES_PER_BITS
+    scl_modes = args.scl_mode if args.scl_mode else SCL_MODES
+
+    def progress(name: str, metrics: dict) -> None:
+        print(f"  {name:28s} " + ' '.join(map(lambda m: f"{m}={metrics[m]:.2f}", METRICS.keys())))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        assert baseline.get('version') == BASELINE_VERSION, f"{args.compare} version {baseline.get('version')} is not {BASELINE_VERSION}"
+        if not baseline.get('results') and not args.allow_new:
+            print(f"{args.compare} has no results, measure one with --update-baseline (or pass --allow-new)")
+            return 1
+
+    results = run(sims, cycles_per_bits, scl_modes, progress)
+
+    retval = 0 if all(map(lambda m: m is not None, results.values())) else 1
+
+    if args.compare:
+        if baseline.get('host') != host():
+            print(f"WARNING: baseline host {baseline.get('host')} is not this host {host()}")
+        rows = compare(results, baseline['results'], args.threshold, args.allow_new)
+        print()
+        print(f"{'config':28s} {'metric':16s} {'value':>12s} {'baseline':>12s} {'worse':>8s}   (threshold {args.threshold:.0f}%)")
+        for (name, metric, value, base, change, regressed) in rows:
+            if metric is None:
+                print(f"{name:28s} FAIL")
+                continue
+            base_s = f"{base:12.2f}" if base is not None else f"{'-':>12s}"
+            change_s = f"{change:+7.1f}%" if change is not None else f"{'new':>8s}"
+            flag = '' if not regressed else ('  REGRESSION' if base is not None else '  NO BASELINE')
+            print(f"{name:28s} {metric:16s} {value:12.2f} {base_s} {change_s}{flag}")
+        regressions = list(filter(lambda r: r[5], rows))
+        if len(regressions) > 0:
+            print(f"{len(regressions)} of {len(rows)} figures failed, have no baseline or regressed more than {args.threshold:.0f}%")
+            retval = 1
+
+    if args.update_baseline:
+        baseline = {'version': BASELINE_VERSION, 'host': host(), 'results': {}}
+        if os.path.exists(args.update_baseline):
+            with open(args.update_baseline, 'r') as f:
+                baseline = json.load(f)
+        measured = dict(filter(lambda kv: kv[1] is not None, results.items()))
+        baseline['version'] = BASELINE_VERSION
+        baseline['host'] = host()
+        baseline['results'].update(measured)
+        with open(args.update_baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+            f.write('\n')
+        print(f"saved {len(measured)} results to {args.update_baseline}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return retval
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+#
+#
+#  SignalAccessor get/set cost per call, no simulator needed.
+#
+#  The signal is a plain object holding a BinaryValue and sim time is a counter, so this
+#  measures the Python side only (snapshot, slicing, write merging) not VPI.
+#  'same' reads are in one timestep (served from the snapshot), 'new' advance the time
+#  before every read so each one takes a fresh snapshot.  'legacy' is the string slicing
+#  the accessors used before, for comparison.
+#
+#  ./bench_signal_accessor.py
+#  ./bench_signal_accessor.py --number 200000
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import sys
+import timeit
+import argparse
+
+from cocotb.binary import BinaryValue
+
+import cocotb_stuff.SignalAccessor as signal_accessor_module
+from cocotb_stuff.SignalAccessor import SignalAccessor
+
+
+# Like a simulator handle a write just stores, the BinaryValue is made when it is read
+class BenchSignal():
+    def __init__(self, name: str, value: str) -> None:
+        self._name = name
+        self._n_bits = len(value)
+        self._value = BinaryValue(value, n_bits=self._n_bits)
+
+    @property
+    def value(self) -> BinaryValue:
+        if isinstance(self._value, int):
+            self._value = format(self._value, f"0{self._n_bits}b")
+        if not isinstance(self._value, BinaryValue):
+            self._value = BinaryValue(self._value, n_bits=self._n_bits)
+        return self._value
+
+    @value.setter
+    def value(self, v) -> None:
+        self._value = v
+
+
+class BenchDut():
+    def __init__(self, signals: list) -> None:
+        self._signals = signals
+
+    def __iter__(self):
+        return iter(self._signals)
+
+
+class BenchClock():
+    def __init__(self) -> None:
+        self.now = 0
+
+    def __call__(self, *args, **kwargs) -> int:
+        return self.now
+
+
+def legacy_bus_get(signal, first_bit: int, last_bit: int) -> BinaryValue:
+    vstr = str(signal.value)
+    ov = vstr[-last_bit-1 : -first_bit:]
+    return BinaryValue(ov, n_bits=last_bit - first_bit + 1)
+
+
+def legacy_bus_set(signal, first_bit: int, last_bit: int, v: str) -> None:
+    vstr = str(signal.value)
+    nstr = vstr[0:-last_bit-1] + v + vstr[-first_bit:]
+    signal.value = BinaryValue(nstr, n_bits=len(nstr))
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description='SignalAccessor get/set cost per call (no simulator)')
+    parser.add_argument('--number', type=int, default=100000, help='calls per case')
+    parser.add_argument('--repeat', type=int, default=3, help='best of')
+    args = parser.parse_args(argv)
+
+    clock = BenchClock()
+    signal_accessor_module.get_sim_time = clock		# no simulator, time is the counter
+
+    signal = BenchSignal('uio_in', '00001100')
+    xz_signal = BenchSignal('uio_out', 'xxxx0zxx')
+    dut = BenchDut([signal, xz_signal])
+
+    sa = SignalAccessor(dut, 'uio_in')
+    bit = sa.register('SDA', 3)
+    bus = sa.register('SDA_SCL', 2, 3)
+    pattern = sa.register_pattern('P', '10100101')
+
+    xz_sa = SignalAccessor(dut, 'uio_out')
+    xz_bus = xz_sa.register('SDA_SCL', 2, 3)
+
+    def tick(fn):
+        def f():
+            clock.now += 1
+            fn()
+        return f
+
+    cases = [
+        ('bit get same',         lambda: bit.value),
+        ('bit get new',          tick(lambda: bit.value)),
+        ('bus get same',         lambda: bus.value),
+        ('bus get new',          tick(lambda: bus.value)),
+        ('bus bits same',        lambda: bus.bits),
+        ('bus get x/z new',      tick(lambda: xz_bus.value)),
+        ('pattern get same',     lambda: pattern.value),
+        ('pattern get new',      tick(lambda: pattern.value)),
+        ('legacy bus get',       lambda: legacy_bus_get(signal, 2, 3)),
+        ('bit set',              lambda: setattr(bit, 'value', True)),
+        ('bus set int',          lambda: setattr(bus, 'value', 2)),
+        ('bus set str',          lambda: setattr(bus, 'value', 'z1')),
+        ('pattern set int',      lambda: setattr(pattern, 'value', 0x5)),
+        ('legacy bus set',       lambda: legacy_bus_set(signal, 2, 3, '01'))
+    ]
+
+    print(f"{'case':22s} {'ns/call':>10s}   ({args.number} calls, best of {args.repeat})")
+    for (name, fn) in cases:
+        best = min(timeit.repeat(fn, number=args.number, repeat=args.repeat))
+        print(f"{name:22s} {best * 1e9 / args.number:10.1f}")
+
+    print(f"SignalAccessor {sa.path} {sa.counters()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,267 @@
+#!/usr/bin/python3
+#
+#
+#  cocotb_stuff hot path microbenchmarks with a stored baseline, no simulator needed.
+#
+#  The signals are DummyHandleObject (cocotb_proxy_dut) with a FakeHandle, the value is
+#  stored as a BinaryValue and sim time is a counter, so this measures the Python side
+#  only.  Each case is timed --repeat times and the median reported in ns per call.
+#
+#  --save writes the results as the baseline (JSON), --compare reads a baseline and fails
+#  (exit 1) when any case is slower than the baseline by more than --threshold percent
+#  and by more than --floor ns (sub-microsecond cases move by a few tens of ns with the
+#  host load alone).  A fixed calibration loop is timed interleaved with the repeats of
+#  each case and saved with the baseline, each baseline figure is scaled by how much
+#  slower or faster its calibration ran, so a busy or throttled host does not show up as
+#  a regression.  The baseline
+#  is only meaningful on the machine (and Python) it was measured on, the host is
+#  recorded in the file.  Save it from a quiet run.
+#
+#  ./bench_suite.py
+#  ./bench_suite.py --compare bench_baseline.json
+#  ./bench_suite.py --save bench_baseline.json
+#  ./bench_suite.py --filter 'SignalAccessor|PathFilter' --number 200000
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import io
+import re
+import sys
+import json
+import types
+import timeit
+import statistics
+import argparse
+import platform
+import contextlib
+
+from cocotb.binary import BinaryValue
+from cocotb.simulator import INTEGER
+
+from cocotb_stuff.cocotb_proxy_dut import FakeHandle, DummyHandleObject
+from cocotb_stuff.cocotbutil import *
+from cocotb_stuff.cocotbutil import binary_value_bit, my_bin, random_binary_value
+import cocotb_stuff.SignalAccessor as signal_accessor_module
+from cocotb_stuff.SignalAccessor import SignalAccessor
+from cocotb_stuff.Payload import Payload
+from cocotb_stuff.FSM import FSM
+from cocotb_stuff.SimConfig import SimConfig
+from cocotb_stuff.I2CController import I2CController
+
+from test_i2c_bert import exclude_re_path, ensure_exclude_re_path
+
+
+BASELINE_VERSION = 2
+
+
+# DummyHandleObject that keeps a BinaryValue like a simulator handle, writes of int/str
+#  are converted as they are stored
+class BenchHandle(DummyHandleObject):
+    def __init__(self, path: str, value: str) -> None:
+        self._n_bits = len(value)
+        h = FakeHandle(path, INTEGER)
+        super().__init__(h, path, INTEGER, value)
+        return None
+
+    @property
+    def value(self) -> BinaryValue:
+        return self._bv
+
+    @value.setter
+    def value(self, v) -> None:
+        if isinstance(v, int):
+            v = format(v, f"0{self._n_bits}b")
+        if isinstance(v, str):
+            v = BinaryValue(v, n_bits=self._n_bits)
+        self._bv = v
+
+
+class BenchDut():
+    def __init__(self, handles: list) -> None:
+        self._handles = handles
+
+    def __iter__(self):
+        return iter(self._handles)
+
+
+class BenchClock():
+    def __init__(self) -> None:
+        self.now = 0
+
+    def __call__(self, *args, **kwargs) -> int:
+        return self.now
+
+
+class BenchLog():
+    def info(self, *args, **kwargs) -> None:
+        pass
+
+
+# [(name, fn)]
+def cases() -> list:
+    clock = BenchClock()
+    signal_accessor_module.get_sim_time = clock		# no simulator, time is the counter
+
+    uio_in = BenchHandle('uio_in', '00001100')
+    fsm_string = BenchHandle('i2c.fsm_stateReg_string', '0' * 64)
+    fsm_string.value = BinaryValue(b'HUNT    ')
+    dut = BenchDut([uio_in, fsm_string])
+    dut._log = BenchLog()
+
+    sa = SignalAccessor(dut, 'uio_in')
+    bit = sa.register('SDA', 3)
+    bus = sa.register('SDA_SCL', 2, 3)
+
+    def tick(fn):
+        def f():
+            clock.now += 1
+            return fn()
+        return f
+
+    bv = BinaryValue('00001100', n_bits=8)
+
+    payload = Payload.fill(0xa5, 64)
+    payload_other = Payload.fill(0xa5, 64)
+
+    fsm = FSM({'i2c': 'i2c.fsm_stateReg_string'})
+    sim_config = SimConfig(dut, types.SimpleNamespace(SIM_NAME='Icarus Verilog'))
+
+    ctrl = object.__new__(I2CController)	# only the bit state helpers are used
+    ctrl.GL_TEST = False
+    ctrl._modeIsPP = False
+
+    paths = [
+        'tb.user_project.i2c_bert.i2c.fsm_stateReg',
+        'tb.user_project._0123_',
+        'tb.user_project.net42',
+        'tb.user_project.clkbuf_leaf_3_clk.A',
+        'tb.user_project.i2c_bert.latched[3]'
+    ]
+
+    def quiet(fn):
+        def f():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return fn()
+        return f
+
+    return [
+        ('SignalAccessor bit get',           tick(lambda: bit.value)),
+        ('SignalAccessor bit get same',      lambda: bit.value),
+        ('SignalAccessor bus get',           tick(lambda: bus.value)),
+        ('SignalAccessor bus set',           lambda: setattr(bus, 'value', 2)),
+        ('SignalAccessor bit set',           lambda: setattr(bit, 'value', True)),
+        ('binary_value_bit get',             lambda: binary_value_bit(bv, 3)),
+        ('binary_value_bit set',             lambda: binary_value_bit(bv, 3, True)),
+        ('my_bin',                           lambda: my_bin(0x86, 8)),
+        ('random_binary_value 8',            lambda: random_binary_value(1, 'tb.user_project.net42', 8)),
+        ('random_binary_value 256',          lambda: random_binary_value(1, 'tb.DEBUG', 256)),
+        ('Payload fill 64',                  lambda: Payload.fill(0xa5, 64)),
+        ('Payload bit_stuff_count 64',       lambda: payload.bit_stuff_count()),
+        ('Payload equals 64',                lambda: payload.equals(payload_other)),
+        ('FSM fsm_printable',                lambda: fsm.fsm_printable(fsm_string)),
+        ('SimConfig bv_compare_x 8',         quiet(lambda: sim_config.bv_compare_x('101x10z1', '10?x??z1'))),
+        ('I2CController resolve_bits_state', lambda: ctrl.resolve_bits_state_str(True, False)),
+        ('PathFilter exclude (memoised)',    lambda: list(map(lambda p: exclude_re_path(p, None), paths))),
+        ('PathFilter ensure (memoised)',     lambda: list(map(lambda p: ensure_exclude_re_path(p, None), paths))),
+        ('PathFilter ensure (compile+first)',lambda: ensure_exclude_re_path.__class__(ensure_exclude_re_path.patterns)(paths[1], None))
+    ]
+
+
+# Plain Python of about the same mix as the cases (slicing, int parse, str methods), does
+#  not touch cocotb_stuff so it only changes with the host/interpreter speed
+def calibration() -> int:
+    s = '0000110010100101'
+    return int(s[4:12], 2) + len(s.lower()) + s.count('1')
+
+
+def host() -> dict:
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(), 'machine': platform.machine(), 'system': platform.system()}
+
+
+# (ns, calibration_ns) per call, medians of the repeats with the calibration loop timed
+#  between them
+def measure(fn, number: int, repeat: int) -> tuple:
+    times = []
+    cal_times = []
+    for i in range(repeat):
+        times.append(timeit.timeit(fn, number=number))
+        cal_times.append(timeit.timeit(calibration, number=number))
+    return (statistics.median(times) * 1e9 / number, statistics.median(cal_times) * 1e9 / number)
+
+
+# ({name: ns}, {name: calibration_ns})
+def run(filter_re: str, number: int, repeat: int) -> tuple:
+    results = {}
+    calibrations = {}
+    for (name, fn) in cases():
+        if filter_re and re.search(filter_re, name) is None:
+            continue
+        (results[name], calibrations[name]) = measure(fn, number, repeat)
+    return (results, calibrations)
+
+
+# [(name, ns, baseline_ns, change_percent, regressed)] baseline_ns is scaled by the
+#  calibration loop timed with the case
+def compare(results: dict, calibrations: dict, baseline: dict, baseline_calibrations: dict, threshold: float, floor: float) -> list:
+    rows = []
+    for (name, ns) in results.items():
+        base = baseline.get(name)
+        if base is None or base <= 0:
+            rows.append((name, ns, None, None, False))
+            continue
+        if baseline_calibrations.get(name):
+            base *= calibrations[name] / baseline_calibrations[name]
+        change = (ns - base) * 100 / base
+        rows.append((name, ns, base, change, change > threshold and ns - base > floor))
+    return rows
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description='cocotb_stuff microbenchmarks with a stored baseline (no simulator)')
+    parser.add_argument('--number', type=int, default=20000, help='calls per case')
+    parser.add_argument('--repeat', type=int, default=15, help='timings per case, the median is used')
+    parser.add_argument('--filter', type=str, default=None, help='regex of the case names to run')
+    parser.add_argument('--save', type=str, default=None, metavar='FILE', help='write the results as the baseline')
+    parser.add_argument('--compare', type=str, default=None, metavar='FILE', help='compare with the baseline')
+    parser.add_argument('--threshold', type=float, default=25.0, help='percent slower than the baseline that is a regression')
+    parser.add_argument('--floor', type=float, default=100.0, help='ns per call slower than the baseline that is ignored')
+    args = parser.parse_args(argv)
+
+    (results, calibrations) = run(args.filter, args.number, args.repeat)
+
+    retval = 0
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        assert baseline.get('version') == BASELINE_VERSION, f"{args.compare} version {baseline.get('version')} is not {BASELINE_VERSION}"
+        if baseline.get('host') != host():
+            print(f"WARNING: baseline host {baseline.get('host')} is not this host {host()}")
+        rows = compare(results, calibrations, baseline['results'], baseline['calibration'], args.threshold, args.floor)
+        print(f"{'case':36s} {'ns/call':>10s} {'baseline':>10s} {'change':>8s}   (threshold +{args.threshold:.0f}% and +{args.floor:.0f} ns, baseline scaled by calibration)")
+        for (name, ns, base, change, regressed) in rows:
+            base_s = f"{base:10.1f}" if base is not None else f"{'-':>10s}"
+            change_s = f"{change:+7.1f}%" if change is not None else f"{'new':>8s}"
+            print(f"{name:36s} {ns:10.1f} {base_s} {change_s}{'  REGRESSION' if regressed else ''}")
+        regressions = list(filter(lambda r: r[4], rows))
+        if len(regressions) > 0:
+            print(f"{len(regressions)} of {len(rows)} cases regressed more than {args.threshold:.0f}% and {args.floor:.0f} ns")
+            retval = 1
+    else:
+        print(f"{'case':36s} {'ns/call':>10s} {'calib':>10s}   ({args.number} calls, median of {args.repeat})")
+        for (name, ns) in results.items():
+            print(f"{name:36s} {ns:10.1f} {calibrations[name]:10.1f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'version': BASELINE_VERSION, 'host': host(), 'number': args.number, 'repeat': args.repeat, 'results': results, 'calibration': calibrations}, f, indent=2)
+            f.write('\n')
+        print(f"saved {len(results)} results to {args.save}")
+
+    return retval
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
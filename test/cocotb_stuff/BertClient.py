@@ -0,0 +1,307 @@
+#
+#
+#  Typed command client for the BERT register protocol, on top of I2CController.
+#
+#  Every command is described by an op_xxx() builder that returns a BertOp, the I2CCommand
+#  bytes to put on the bus plus a decoder for the bytes read back.  The async methods of
+#  the same name run a single op as its own START..STOP transaction and return the decoded
+#  value.  batch() collects ops and runs them as one transaction chained with
+#  repeated-START, the I2CCommand list is built once so the same batch can be run again.
+#
+#  With a BertScoreboard every read is compared with the predicted value as it completes.
+#
+#    client = BertClient(ctrl)
+#    cfg = await client.get_cfg()
+#
+#    batch = client.batch()
+#    batch.set_data(0x69)
+#    batch.alu(BertClient.ALU_ADD, [0x03])
+#    batch.get_send(2)
+#    (_, _, send) = await batch.run()
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+from collections import namedtuple
+
+from cocotb.triggers import ClockCycles
+
+from cocotb_stuff.I2CController import *
+from cocotb_stuff.BertScoreboard import *
+
+
+# decode(values: list) -> any, None when the command reads nothing
+BertOp = namedtuple('BertOp', 'command decode')
+
+# GETCFG is the same layout as LATCHED: bit0..2 SCL_MODE, bit3 PUSH_PULL_MODE
+BertConfig = namedtuple('BertConfig', 'scl_mode push_pull raw')
+
+
+class BertClient():
+    GETCFG   = 0xc1
+    SETLEDAC = 0xc4
+    SETLEN   = 0xd0
+    GETLEN   = 0xd1
+    SETENDS  = 0xe0
+    GETENDS  = 0xe1
+    RESET    = 0xf0
+    GETLATCH = 0xf1
+    SETLED   = 0xf4
+    GETLED   = 0xf5
+    SETDATA  = 0xf8
+    GETDATA  = 0xf9
+    SETRECV  = 0xfc
+    GETSEND  = 0xfd
+
+    ALU_AND = 'and'
+    ALU_OR  = 'or'
+    ALU_XOR = 'xor'
+    ALU_ADD = 'add'
+
+    ALU_OPS = [ALU_AND, ALU_OR, ALU_XOR, ALU_ADD]	# index is the opcode bits [3:2]
+
+    ALU_MAX_LEN = 16	# len4 + 1
+
+    # SETCFG (0xc0) is not provided, the DUT currently NACKs the data byte
+
+    # verify(state: str) and on_command(I2CCommand) are passed to I2CController.transaction()
+    # idle_cycles of dut.clk are waited after every STOP, the bus free time between transactions
+    def __init__(self, ctrl: I2CController, verify = None, on_command = None, can_assert: bool = True, idle_cycles: int = None, scoreboard: BertScoreboard = None) -> None:
+        self._ctrl = ctrl
+        self._scoreboard = scoreboard
+        self._verify = verify
+        self._on_command = on_command
+        self._can_assert = can_assert
+        self._idle_cycles = idle_cycles if idle_cycles is not None else ctrl.CYCLES_PER_BIT*4
+        return None
+
+
+    @property
+    def ctrl(self) -> I2CController:
+        return self._ctrl
+
+
+    @property
+    def scoreboard(self) -> BertScoreboard:
+        return self._scoreboard
+
+
+    @staticmethod
+    def cmd_alu(op: str, length: int, read: bool = False) -> int:
+        assert op in BertClient.ALU_OPS, f"op={op} is not one of {BertClient.ALU_OPS}"
+        assert length >= 1 and length <= BertClient.ALU_MAX_LEN, f"length={length} out of range 1..{BertClient.ALU_MAX_LEN}"
+        v = ((length - 1) & 0xf) << 4
+        v |= BertClient.ALU_OPS.index(op) << 2
+        v |= 0x02
+        if read:
+            v |= 0x01
+        return v
+
+
+    @staticmethod
+    def _byte(v: int) -> int:
+        assert (v & ~0xff) == 0, f"value=0x{v:x} is not a byte"
+        return v
+
+
+    @staticmethod
+    def _first(values: list) -> int:
+        return values[0]
+
+
+    @staticmethod
+    def decode_cfg(values: list) -> BertConfig:
+        v = values[0]
+        return BertConfig(v & 0x7, (v & 0x08) != 0, v)
+
+
+    @staticmethod
+    def decode_ends(values: list) -> int:
+        return ((values[1] & 0xf) << 8) | values[0]
+
+
+    ### builders ###
+
+    def op_get_cfg(self) -> BertOp:
+        return BertOp(I2CCommand(self.GETCFG, read=1, label='GETCFG'), self.decode_cfg)
+
+    def op_get_len(self) -> BertOp:
+        return BertOp(I2CCommand(self.GETLEN, read=1, label='GETLEN'), self._first)
+
+    def op_set_len(self, n: int) -> BertOp:
+        return BertOp(I2CCommand(self.SETLEN, (self._byte(n),), label='SETLEN'), None)
+
+    # 12-bit value, after reset this reads back as DIV12 ^ 0xfff
+    def op_get_ends(self) -> BertOp:
+        return BertOp(I2CCommand(self.GETENDS, read=2, label='GETENDS'), self.decode_ends)
+
+    def op_set_ends(self, v: int) -> BertOp:
+        assert (v & ~0xfff) == 0, f"ends=0x{v:x} is not 12-bit"
+        return BertOp(I2CCommand(self.SETENDS, (v & 0xff, (v >> 8) & 0xf), label='SETENDS'), None)
+
+    def op_get_latch(self) -> BertOp:
+        return BertOp(I2CCommand(self.GETLATCH, read=4, label='GETLATCH'), list)
+
+    def op_get_led(self) -> BertOp:
+        return BertOp(I2CCommand(self.GETLED, read=1, label='GETLED'), self._first)
+
+    def op_set_led(self, v: int) -> BertOp:
+        return BertOp(I2CCommand(self.SETLED, (self._byte(v),), label='SETLED'), None)
+
+    def op_set_led_ac(self) -> BertOp:
+        return BertOp(I2CCommand(self.SETLEDAC, label='SETLEDAC'), None)
+
+    def op_get_data(self) -> BertOp:
+        return BertOp(I2CCommand(self.GETDATA, read=1, label='GETDATA'), self._first)
+
+    def op_set_data(self, v: int) -> BertOp:
+        return BertOp(I2CCommand(self.SETDATA, (self._byte(v),), label='SETDATA'), None)
+
+    def op_get_send(self, count: int = 1) -> BertOp:
+        assert count > 0
+        return BertOp(I2CCommand(self.GETSEND, read=count, label='GETSEND'), list)
+
+    def op_set_recv(self, data: list) -> BertOp:
+        return BertOp(I2CCommand(self.SETRECV, tuple(map(self._byte, data)), label='SETRECV'), None)
+
+    def op_reset(self) -> BertOp:
+        return BertOp(I2CCommand(self.RESET, label='RESET'), None)
+
+    # Write: operand is a byte or list of 1..16 bytes, the accumulator is updated
+    # Read (read=True): operand is the count of bytes to read 1..16, each is the accumulator
+    # The length goes in len4, the DUT burst is ({LEN, len4} + 1) bytes so LEN must be zero
+    def op_alu(self, op: str, operand, read: bool = False) -> BertOp:
+        label = f"ALU{'R' if read else ''}_{op.upper()}"
+        if read:
+            assert type(operand) is int
+            return BertOp(I2CCommand(self.cmd_alu(op, operand, True), read=operand, label=label), list)
+        data = (operand,) if type(operand) is int else tuple(operand)
+        return BertOp(I2CCommand(self.cmd_alu(op, len(data)), tuple(map(self._byte, data)), label=label), None)
+
+
+    ### execution ###
+
+    # Run ops as one transaction, returns the decoded value of each (None for writes)
+    async def run(self, ops: list) -> list:
+        return await self._run(list(map(lambda o: o.command, ops)), list(map(lambda o: o.decode, ops)))
+
+
+    async def _run(self, commands: list, decoders: list) -> list:
+        results = await self._ctrl.transaction(commands, verify=self._verify, on_command=self._on_command, can_assert=self._can_assert)
+        if self._scoreboard:
+            for (command, values) in zip(commands, results):
+                self._scoreboard.check(command, values)
+        self._ctrl.idle()
+        if self._idle_cycles > 0:
+            await ClockCycles(self._ctrl._dut.clk, self._idle_cycles)
+        return list(map(lambda dv: dv[0](dv[1]) if dv[0] else None, zip(decoders, results)))
+
+
+    async def _run1(self, op: BertOp):
+        return (await self.run([op]))[0]
+
+
+    async def get_cfg(self) -> BertConfig:
+        return await self._run1(self.op_get_cfg())
+
+    async def get_len(self) -> int:
+        return await self._run1(self.op_get_len())
+
+    async def set_len(self, n: int) -> None:
+        await self._run1(self.op_set_len(n))
+
+    async def get_ends(self) -> int:
+        return await self._run1(self.op_get_ends())
+
+    async def set_ends(self, v: int) -> None:
+        await self._run1(self.op_set_ends(v))
+
+    async def get_latch(self) -> list:
+        return await self._run1(self.op_get_latch())
+
+    async def get_led(self) -> int:
+        return await self._run1(self.op_get_led())
+
+    async def set_led(self, v: int) -> None:
+        await self._run1(self.op_set_led(v))
+
+    async def set_led_ac(self) -> None:
+        await self._run1(self.op_set_led_ac())
+
+    async def get_data(self) -> int:
+        return await self._run1(self.op_get_data())
+
+    async def set_data(self, v: int) -> None:
+        await self._run1(self.op_set_data(v))
+
+    async def get_send(self, count: int = 1) -> list:
+        return await self._run1(self.op_get_send(count))
+
+    async def set_recv(self, data: list) -> None:
+        await self._run1(self.op_set_recv(data))
+
+    async def reset(self) -> None:
+        await self._run1(self.op_reset())
+
+    async def alu(self, op: str, operand, read: bool = False):
+        return await self._run1(self.op_alu(op, operand, read))
+
+
+    def batch(self) -> 'BertBatch':
+        return BertBatch(self)
+
+
+# Collects ops, batch.get_cfg() etc take the same arguments as the BertClient methods but
+#  only append the op.  run() can be awaited more than once, the schedule is kept.
+class BertBatch():
+    def __init__(self, client: BertClient) -> None:
+        self._client = client
+        self._ops = []
+        self._commands = None	# cached I2CCommand list
+        self._decoders = None
+        return None
+
+
+    def __getattr__(self, name: str):
+        builder = getattr(self._client, f"op_{name}", None)
+        if builder is None:
+            raise AttributeError(name)
+
+        def append(*args, **kwargs) -> int:
+            return self.add(builder(*args, **kwargs))
+        return append
+
+
+    # returns the index of the result in run()
+    def add(self, op: BertOp) -> int:
+        self._ops.append(op)
+        self._commands = None
+        return len(self._ops) - 1
+
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+
+    @property
+    def commands(self) -> list:
+        if self._commands is None:
+            self._commands = list(map(lambda o: o.command, self._ops))
+            self._decoders = list(map(lambda o: o.decode, self._ops))
+        return self._commands
+
+
+    async def run(self) -> list:
+        assert len(self._ops) > 0
+        commands = self.commands
+        return await self._client._run(commands, self._decoders)
+
+
+__all__ = [
+    'BertClient',
+    'BertBatch',
+    'BertOp',
+    'BertConfig'
+]
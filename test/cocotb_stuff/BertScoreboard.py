@@ -0,0 +1,125 @@
+#
+#
+#  Reference model of the BERT registers, predicts what each command reads back.
+#
+#  Models the 8-bit ALU accumulator (SETDATA loads it, SETRECV adds 1 per byte, ALU
+#  writes apply AND/OR/XOR/ADD per operand byte, RESET clears it, GETDATA/GETSEND/ALU
+#  reads return it), LEN (len8), LED and ENDS.  A register that has not been written since
+#  the scoreboard was created is unknown (None) and is not predicted.
+#
+#  ALU bursts: the command byte carries len4, the burst is len12+1 bytes where
+#  len12 = {len8, len4}, so 1..16 operand bytes per command when LEN is zero.
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+from cocotb_stuff.I2CController import I2CCommand
+
+
+class BertScoreboard():
+    # after rst_n the accumulator and LEN are zero
+    def __init__(self, acc: int = 0, len8: int = 0, led: int = None, ends: list = None) -> None:
+        self.acc = acc
+        self.len8 = len8
+        self.led = led
+        self.ends = ends
+        self._checked = 0		# read commands compared
+        self._bytes = 0			# bytes compared
+        return None
+
+
+    @staticmethod
+    def is_alu(cmd: int) -> bool:
+        return (cmd & 0x02) != 0
+
+
+    def burst_length(self, cmd: int) -> int:
+        if self.len8 is None:
+            return None
+        return ((self.len8 << 4) | ((cmd >> 4) & 0xf)) + 1
+
+
+    @staticmethod
+    def alu(op: int, acc: int, opand: int) -> int:
+        if op == 0:
+            return acc & opand
+        if op == 1:
+            return acc | opand
+        if op == 2:
+            return acc ^ opand
+        return (acc + opand) & 0xff
+
+
+    # Expected bytes read by the command, None when unknown
+    def predict(self, command: I2CCommand) -> list:
+        cmd = command.cmd
+        if command.read == 0:
+            return []
+        if self.is_alu(cmd) or cmd in [0xf9, 0xfd]:
+            v = self.acc
+        elif cmd == 0xf5:
+            v = self.led
+        elif cmd == 0xd1:
+            v = self.len8
+        elif cmd == 0xe1 and self.ends is not None:
+            return self.ends[:command.read]
+        else:
+            return None
+        return [v] * command.read if v is not None else None
+
+
+    # Apply the side effects of a completed command
+    def update(self, command: I2CCommand) -> None:
+        cmd = command.cmd
+        if self.is_alu(cmd):
+            if (cmd & 0x01) == 0 and self.acc is not None:
+                for v in command.write:
+                    self.acc = self.alu((cmd >> 2) & 0x3, self.acc, v)
+        elif cmd == 0xf8:
+            if len(command.write) > 0:
+                self.acc = command.write[-1]
+        elif cmd == 0xfc:
+            if self.acc is not None:
+                self.acc = (self.acc + len(command.write)) & 0xff
+        elif cmd == 0xf0:
+            self.acc = 0
+            self.len8 = 0
+        elif cmd == 0xf4:
+            if len(command.write) > 0:
+                self.led = command.write[-1]
+        elif cmd == 0xd0:
+            if len(command.write) > 0:
+                self.len8 = command.write[-1]
+        elif cmd == 0xe0:
+            if len(command.write) == 2:
+                self.ends = list(command.write)
+
+
+    def check(self, command: I2CCommand, values: list) -> None:
+        if self.is_alu(command.cmd):
+            length = self.burst_length(command.cmd)
+            count = command.read if (command.cmd & 0x01) != 0 else len(command.write)
+            assert length is None or count == length, f"{command.label} burst of {count} bytes but len12+1 = {length}"
+        expected = self.predict(command)
+        if expected is not None and command.read > 0:
+            assert values == expected, f"{command.label} cmd=0x{command.cmd:02x} read {values} expected {expected}"
+            self._checked += 1
+            self._bytes += len(values)
+        self.update(command)
+
+
+    @property
+    def checked(self) -> int:
+        return self._checked
+
+
+    def __str__(self) -> str:
+        acc = f"0x{self.acc:02x}" if self.acc is not None else None
+        return f"BertScoreboard(acc={acc}, len8={self.len8}, checked={self._checked} commands {self._bytes} bytes)"
+
+
+__all__ = [
+    'BertScoreboard'
+]
@@ -0,0 +1,150 @@
+#
+#
+#  Wired-AND bus model of the bidirectional I2C lines.
+#
+#  Each line resolves as:  pull-up AND controller drive AND (DUT OE ? DUT out : 1)
+#  with the controller side on uio_in and the DUT side on uio_out/uio_oe.  The bus is
+#  open-drain so only a known '0' on uio_in is a controller drive, '1' is a release.  The three
+#  signals are taken from the SignalAccessor snapshots (integer value and X/Z mask, one
+#  VPI read per simulator callback) and resolved once per simulator callback (see
+#  SignalAccessor.step_key(), the DUT side changes in later deltas of a timestep), every
+#  query after that is a lookup of the cached result.
+#
+#  'x'/'z' bits are never guessed at by the callers:
+#   DUT OE unknown is treated as not driving, DUT out unknown with OE=1 as released
+#   (open-drain pull-up) and both are counted in unresolved.
+#  Contention (the DUT pushes a known '1', uio_oe=1 uio_out=1, while the controller
+#   drives '0') is recorded in the contention mask and counted.  The DUT pulling low
+#   while the controller releases (ACK, read data, clock stretching) is normal traffic.
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+from cocotb_stuff import *
+from cocotb_stuff.SignalAccessor import *
+
+
+class BusResolver():
+    LINE_MASK = SCL_BITID_MASK | SDA_BITID_MASK
+
+    def __init__(self, dut, mask: int = LINE_MASK) -> None:
+        self._dut = dut
+        self._mask = mask
+
+        self._sa_uio_in = SignalAccessor.get(dut, 'uio_in')
+        self._sa_uio_out = SignalAccessor.get(dut, 'uio_out')
+        self._sa_uio_oe = SignalAccessor.get(dut, 'uio_oe')
+
+        self._time = None		# SignalAccessor.step_key() of the cached resolution
+        self._ctrl_drive = 0		# controller drives the bit low
+        self._dut_oe = 0		# DUT OE=1 (known)
+        self._dut_value = 0		# DUT out, unknown bits read as 1
+        self._line = mask
+        self._contention_mask = 0
+        self._unresolved_mask = 0
+
+        self._samples = 0
+        self._lookups = 0
+        self._contention = 0		# resolutions with contention
+        self._unresolved = 0		# resolutions with an unresolved DUT bit
+        return None
+
+
+    def invalidate(self) -> None:
+        self._time = None
+
+
+    def _update(self) -> None:
+        now = SignalAccessor.step_key()
+        self._lookups += 1
+        if now == self._time:
+            return
+        self._time = now
+        self._samples += 1
+        mask = self._mask
+
+        (in_value, in_xz) = self._sa_uio_in.snapshot()
+        (out_value, out_xz) = self._sa_uio_out.snapshot()
+        (oe_value, oe_xz) = self._sa_uio_oe.snapshot()
+        in_known = ~in_xz
+        out_known = ~out_xz
+        oe_known = ~oe_xz
+
+        ctrl_drive = in_known & ~in_value & mask
+        dut_oe = oe_value & oe_known & mask
+        unresolved = ((~oe_known) | (dut_oe & ~out_known)) & mask
+        dut_value = (out_value | ~out_known) & mask
+
+        dut_low = dut_oe & ~dut_value
+        line = mask & ~ctrl_drive & ~dut_low
+
+        contention = ctrl_drive & dut_oe & out_known & out_value & mask
+
+        self._ctrl_drive = ctrl_drive
+        self._dut_oe = dut_oe
+        self._dut_value = dut_value
+        self._line = line
+        if contention and not self._contention_mask:
+            self._dut._log.warning(f"BusResolver contention uio_in={self._sa_uio_in.signal_str()} uio_out={self._sa_uio_out.signal_str()} uio_oe={self._sa_uio_oe.signal_str()}")
+        if contention:
+            self._contention += 1
+        if unresolved:
+            self._unresolved += 1
+        self._contention_mask = contention
+        self._unresolved_mask = unresolved
+
+
+    # Resolved line level (wired-AND with pull-up), bit_mask is SCL_BITID_MASK or SDA_BITID_MASK
+    def line(self, bit_mask: int) -> bool:
+        self._update()
+        return (self._line & bit_mask) != 0
+
+
+    def dut_oe(self, bit_mask: int) -> bool:
+        self._update()
+        return (self._dut_oe & bit_mask) != 0
+
+
+    # DUT output level, an unresolved bit reads as 1 (released)
+    def dut_out(self, bit_mask: int) -> bool:
+        self._update()
+        return (self._dut_value & bit_mask) != 0
+
+
+    # Controller pulls the line low
+    def ctrl_drive(self, bit_mask: int) -> bool:
+        self._update()
+        return (self._ctrl_drive & bit_mask) != 0
+
+
+    def contention(self, bit_mask: int = LINE_MASK) -> bool:
+        self._update()
+        return (self._contention_mask & bit_mask) != 0
+
+
+    def unresolved(self, bit_mask: int = LINE_MASK) -> bool:
+        self._update()
+        return (self._unresolved_mask & bit_mask) != 0
+
+
+    @property
+    def scl(self) -> bool:
+        return self.line(SCL_BITID_MASK)
+
+
+    @property
+    def sda(self) -> bool:
+        return self.line(SDA_BITID_MASK)
+
+
+    def report(self) -> None:
+        self._dut._log.info(f"BusResolver lookups={self._lookups} samples={self._samples} contention={self._contention} unresolved={self._unresolved}")
+        for sa in [self._sa_uio_in, self._sa_uio_out, self._sa_uio_oe]:
+            self._dut._log.info(f"  {sa.path:8s} {sa.counters()}")
+
+
+__all__ = [
+    'BusResolver'
+]
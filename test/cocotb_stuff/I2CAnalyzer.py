@@ -0,0 +1,247 @@
+#
+#
+#  Passive I2C protocol analyzer, decodes transactions from the pins.
+#
+#  The bus lines are the wired-AND of what the controller drives (uio_in) and what the
+#  DUT drives (uio_out qualified by uio_oe).  Only Edge triggers on those signals wake
+#  the analyzer so it costs nothing between bus edges and can stay on in every run
+#  (including GL_TEST where the DUT internals are not available).
+#
+#  Decodes START, repeated-START (Sr), STOP, bytes with ACK/NACK and clock-stretch
+#  intervals (controller released SCL but the DUT holds it low) into a record per
+#  transaction and keeps counters per command (the first byte after START).
+#
+#  Listeners (see add_listener) are told about every resolved SCL/SDA change and which
+#  side (controller or DUT) caused it, so other checks can reuse the same wakeups.
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+from collections import namedtuple
+
+import cocotb
+from cocotb.triggers import Edge
+from cocotb.utils import get_sim_time
+
+from cocotb_stuff import *
+from cocotb_stuff.cocotbutil import *
+
+
+# data: bytes, acks: str of 'A'/'N' per byte, stretch: tuple of (start_ps, duration_ps)
+# end: 'P' STOP, 'Sr' repeated-START or None when still open at shutdown
+I2CTransaction = namedtuple('I2CTransaction', 'start_ps end_ps repeated end phase data acks stretch')
+
+
+def transaction_str(t: I2CTransaction) -> str:
+    items = ['Sr' if t.repeated else 'S']
+    for i in range(len(t.data)):
+        items.append(f"{t.data[i]:02x}")
+        if i < len(t.acks):
+            items.append(t.acks[i])
+    items.append(t.end if t.end else '...')
+    s = ' '.join(items)
+    if t.stretch:
+        s += f"  stretch={len(t.stretch)}x{sum(map(lambda st: st[1], t.stretch))}ps"
+    return f"{t.phase}: {s}"
+
+
+class I2CAnalyzer():
+    def __init__(self, dut, label: str = 'i2c', keep: int = None) -> None:
+        self._dut = dut
+        self._label = label
+        self._keep = keep		# limit on records retained, None for all
+
+        self._running = False
+        self._tasks = []
+
+        self._records = []
+        self._counters = {}		# command byte => count
+        self._events = {}		# START Sr STOP ACK NACK STRETCH BYTE => count
+
+        self._ctrl_scl = '1'
+        self._ctrl_sda = '1'
+        self._dut_scl = '1'
+        self._dut_sda = '1'
+        self._scl = '1'
+        self._sda = '1'
+
+        self._open = None		# the transaction being decoded (dict) or None
+        self._bitcount = 0
+        self._shift = 0
+        self._stretch_ps = None		# when the current stretch started
+
+        self._listeners = []
+        return None
+
+
+    # fn(now_ps, scl, sda, scl_changed, sda_changed, scl_source, sda_source) source: 'ctrl'|'dut'
+    def add_listener(self, fn) -> None:
+        self._listeners.append(fn)
+
+
+    def start(self) -> None:
+        assert not self._running
+        self._running = True
+        self._sample()
+        self._scl = self._resolve(self._ctrl_scl, self._dut_scl)
+        self._sda = self._resolve(self._ctrl_sda, self._dut_sda)
+        for signal in [self._dut.uio_in, self._dut.uio_out, self._dut.uio_oe]:
+            self._tasks.append(cocotb.start_soon(self.edge_coroutine(signal)))
+
+
+    def shutdown(self) -> None:
+        self._running = False
+        for task in self._tasks:
+            task.kill()
+        self._tasks = []
+        if self._open is not None:
+            self._close(get_sim_time('ps'), None)
+
+
+    async def edge_coroutine(self, signal) -> None:
+        while self._running:
+            await Edge(signal)
+            self._update(get_sim_time('ps'))
+
+
+    @staticmethod
+    def _resolve(ctrl: str, dut: str) -> str:
+        # wired-AND, anything not driven low is pulled up
+        return '0' if ctrl == '0' or dut == '0' else '1'
+
+
+    def _sample(self) -> None:
+        uio_in = str(self._dut.uio_in.value)
+        uio_out = str(self._dut.uio_out.value)
+        uio_oe = str(self._dut.uio_oe.value)
+        # bit0 on right hand side
+        self._ctrl_scl = uio_in[-SCL_BITID-1]
+        self._ctrl_sda = uio_in[-SDA_BITID-1]
+        self._dut_scl = uio_out[-SCL_BITID-1] if uio_oe[-SCL_BITID-1] == '1' else 'z'
+        self._dut_sda = uio_out[-SDA_BITID-1] if uio_oe[-SDA_BITID-1] == '1' else 'z'
+
+
+    def _update(self, now: int) -> None:
+        ctrl_scl = self._ctrl_scl
+        ctrl_sda = self._ctrl_sda
+        self._sample()
+        scl = self._resolve(self._ctrl_scl, self._dut_scl)
+        sda = self._resolve(self._ctrl_sda, self._dut_sda)
+
+        if self._listeners and (scl != self._scl or sda != self._sda):
+            scl_source = 'ctrl' if self._ctrl_scl != ctrl_scl else 'dut'
+            sda_source = 'ctrl' if self._ctrl_sda != ctrl_sda else 'dut'
+            for fn in self._listeners:
+                fn(now, scl, sda, scl != self._scl, sda != self._sda, scl_source, sda_source)
+
+        stretching = self._ctrl_scl != '0' and self._dut_scl == '0'
+        if stretching and self._stretch_ps is None:
+            self._stretch_ps = now
+        elif not stretching and self._stretch_ps is not None:
+            self._event('STRETCH')
+            if self._open is not None:
+                self._open['stretch'].append((self._stretch_ps, now - self._stretch_ps))
+            self._stretch_ps = None
+
+        if scl != self._scl:
+            self._scl = scl
+            self._sda = sda
+            if scl == '1':
+                self._scl_rise()
+            return
+
+        if sda != self._sda:
+            self._sda = sda
+            if scl == '1':
+                if sda == '0':
+                    self._start(now)
+                else:
+                    self._stop(now)
+
+
+    def _scl_rise(self) -> None:
+        if self._open is None:
+            return
+        bit = 1 if self._sda == '1' else 0
+        if self._bitcount < 8:
+            self._shift = (self._shift << 1) | bit
+            self._bitcount += 1
+            return
+        # 9th bit is ACK(0)/NACK(1)
+        self._open['data'].append(self._shift)
+        self._open['acks'].append('N' if bit else 'A')
+        self._event('BYTE')
+        self._event('NACK' if bit else 'ACK')
+        self._bitcount = 0
+        self._shift = 0
+
+
+    def _start(self, now: int) -> None:
+        repeated = self._open is not None
+        if repeated:
+            self._close(now, 'Sr')
+        self._event('Sr' if repeated else 'START')
+        self._open = {
+            'start_ps': now,
+            'repeated': repeated,
+            'phase': debug_value(self._dut),
+            'data': [],
+            'acks': [],
+            'stretch': []
+        }
+        self._bitcount = 0
+        self._shift = 0
+
+
+    def _stop(self, now: int) -> None:
+        self._event('STOP')
+        if self._open is not None:
+            self._close(now, 'P')
+
+
+    def _close(self, now: int, end: str) -> None:
+        o = self._open
+        self._open = None
+        t = I2CTransaction(o['start_ps'], now, o['repeated'], end, o['phase'],
+            bytes(o['data']), ''.join(o['acks']), tuple(o['stretch']))
+        if len(t.data) > 0:
+            self._counters[t.data[0]] = self._counters.get(t.data[0], 0) + 1
+        self._records.append(t)
+        if self._keep is not None and len(self._records) > self._keep:
+            del self._records[0]
+        self._dut._log.debug(f"{self._label}: {transaction_str(t)}")
+
+
+    def _event(self, name: str) -> None:
+        self._events[name] = self._events.get(name, 0) + 1
+
+
+    @property
+    def records(self) -> list:
+        return self._records
+
+
+    @property
+    def counters(self) -> dict:
+        return self._counters
+
+
+    @property
+    def events(self) -> dict:
+        return self._events
+
+
+    def report(self) -> None:
+        events = ' '.join(map(lambda kv: f"{kv[0]}={kv[1]}", self._events.items()))
+        self._dut._log.info(f"ANALYZER {self._label}: {len(self._records)} transactions  {events}")
+        for cmd in sorted(self._counters.keys()):
+            self._dut._log.info(f"  command 0x{cmd:02x} = {self._counters[cmd]}")
+
+
+__all__ = [
+    'I2CAnalyzer',
+    'I2CTransaction',
+    'transaction_str'
+]
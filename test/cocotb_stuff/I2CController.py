@@ -10,13 +10,23 @@
 # SPDX-License-Identifier: Apache2.0
 #
 #
+import math
+from collections import namedtuple
+
 import cocotb
-from cocotb.triggers import RisingEdge, FallingEdge, ClockCycles
+from cocotb.triggers import RisingEdge, FallingEdge, ClockCycles, Timer
 
 from cocotb_stuff import *
 from cocotb.utils import get_sim_time
 from cocotb_stuff.cocotbutil import *
 from cocotb_stuff.SignalAccessor import *
+from cocotb_stuff.Jitter import *
+from cocotb_stuff.BusResolver import *
+
+# One command of a transaction: cmd byte, write: bytes to send after it, read: count of bytes
+#  to receive, label: optional name (for debug())
+I2CCommand = namedtuple('I2CCommand', 'cmd write read label', defaults=[(), 0, None])
+
 
 class I2CController():
     SIGNAL_LIST = [
@@ -31,28 +41,49 @@ class I2CController():
     ACK = False
     NACK = True
 
-    def __init__(self, dut, CYCLES_PER_BIT: int, pp: bool = False, GL_TEST: bool = False):
+    # CYCLES_PER_BIT can be fractional, with CLOCK_PERIOD_PS any value is possible (sub-cycle
+    #  timing uses Timer) without it only whole cycles are possible, the half bit is then a
+    #  multiple of half a cycle (using both clock edges).
+    # jitter offsets every SCL/SDA line transition by a seeded random sub-cycle delay.
+    def __init__(self, dut, CYCLES_PER_BIT: float, pp: bool = False, GL_TEST: bool = False, CLOCK_PERIOD_PS: int = None, jitter: Jitter = None):
         self._dut = dut
         self.GL_TEST = GL_TEST
 
-        self.CYCLES_PER_BIT = CYCLES_PER_BIT
-        self.HALFEDGE = CYCLES_PER_BIT % 2 != 0
-        self.CYCLES_PER_HALFBIT = int(CYCLES_PER_BIT / 2)
-
-        self._dut._log.info(f"I2CController(CYCLES_PER_BIT={self.CYCLES_PER_BIT}, HALFEDGE={self.HALFEDGE}, CYCLES_PER_HALFBIT={self.CYCLES_PER_HALFBIT})")
-
-        self._sa_uio_in = SignalAccessor(dut, 'uio_in')	# FIXME pull from shared registry ?
+        assert CYCLES_PER_BIT >= 2, f"CYCLES_PER_BIT={CYCLES_PER_BIT} is not supported, needs to be >= 2"
+        assert CLOCK_PERIOD_PS is not None or float(CYCLES_PER_BIT).is_integer(), f"CYCLES_PER_BIT={CYCLES_PER_BIT} is fractional, needs CLOCK_PERIOD_PS"
+        self.CLOCK_PERIOD_PS = CLOCK_PERIOD_PS
+
+        # The exact bit period, used by the timing engine
+        self.BIT_PERIOD = float(CYCLES_PER_BIT)
+        self.HALFBIT_PERIOD = self.BIT_PERIOD / 2
+        # Whole cycle forms, CYCLES_PER_BIT is rounded up so it is safe for padding and timeouts
+        self.CYCLES_PER_BIT = math.ceil(self.BIT_PERIOD)
+        self.CYCLES_PER_HALFBIT = int(self.HALFBIT_PERIOD)
+        self.HALFEDGE = not self.HALFBIT_PERIOD.is_integer()
+
+        self._dut._log.info(f"I2CController(CYCLES_PER_BIT={self.CYCLES_PER_BIT}, HALFEDGE={self.HALFEDGE}, CYCLES_PER_HALFBIT={self.CYCLES_PER_HALFBIT}, BIT_PERIOD={self.BIT_PERIOD}, CLOCK_PERIOD_PS={self.CLOCK_PERIOD_PS})")
+
+        # sim time (ps) of a known rising edge of dut.clk, the reference for sub-cycle timing
+        self._edge_ps = None
+        if self.CLOCK_PERIOD_PS is not None:
+            cocotb.start_soon(self.calibrate())
+
+        self._jitter = jitter if jitter is not None and jitter.enabled else None
+        self._drive_pending = None	# [value] of the delayed commit not yet applied
+        self._drive_origin_ps = None	# sim time the pending commit was requested
+        self._drive_commit_ps = 0	# sim time of the last scheduled commit (commits are kept in order)
+        if self._jitter is not None:
+            self._dut._log.info(f"I2CController({self._jitter})")
+
+        self._sa_uio_in = SignalAccessor.get(dut, 'uio_in')	# shared with BusResolver and the test
         # This is a broken idea (over VPI) use self._sdascl
         #self._scl = self._sa.register('uio_in:SCL', SCL_BITID)
         #self._sda = self._sa.register('uio_in:SDA', SDA_BITID)
         self._sdascl = self._sa_uio_in.register('uio_in', SCL_BITID, SDA_BITID)
 
-        # uio_out: This is output from peer, and input/receiver side for us
-        self._sa_uio_out = SignalAccessor(dut, 'uio_out')	# FIXME pull from shared registry ?
-        self._sdascl_out = self._sa_uio_out.register('uio_out', SCL_BITID, SDA_BITID)
-        # uio_oe: This is peer OE
-        self._sa_uio_oe = SignalAccessor(dut, 'uio_oe')	# FIXME pull from shared registry ?
-        self._sdascl_oe = self._sa_uio_oe.register('uio_oe', SCL_BITID, SDA_BITID)
+        # uio_out/uio_oe: This is output from peer, and input/receiver side for us, all reads
+        #  of the bus go through the resolver (one sample per timestep)
+        self._bus = BusResolver(dut)
 
         self._scl_state = self.PULLUP
         self._sda_state = self.PULLUP
@@ -120,16 +151,64 @@ class I2CController():
             self._modeIsPP = PP
 
 
-    async def cycles_after_setup(self):
-        await ClockCycles(self._dut.clk, self.CYCLES_PER_HALFBIT)
-        if self.HALFEDGE:
+    async def calibrate(self) -> None:
+        await RisingEdge(self._dut.clk)
+        self._edge_ps = get_sim_time('ps')
+
+
+    # Position within the current dut.clk period measured from the rising edge
+    def clock_phase_ps(self) -> int:
+        return (get_sim_time('ps') - self._edge_ps) % self.CLOCK_PERIOD_PS
+
+
+    # The timing engine, waits a (possibly fractional) number of dut.clk cycles from now.
+    # Whole cycles use ClockCycles, half cycles use FallingEdge and anything else a Timer.
+    async def wait_cycles(self, cycles: float) -> None:
+        assert cycles >= 0
+        if self.CLOCK_PERIOD_PS is None:
+            await self.wait_cycles_edges(cycles)
+            return
+        if self._edge_ps is None:
+            await self.calibrate()
+
+        period = self.CLOCK_PERIOD_PS
+        phase = self.clock_phase_ps()
+        target = phase + int(round(cycles * period))
+        whole = int(target / period)
+        remainder = target - (whole * period)
+
+        if whole > 0:
+            await ClockCycles(self._dut.clk, whole)
+            self._edge_ps = get_sim_time('ps')
+            phase = 0
+
+        if remainder > phase:
+            if phase == 0 and remainder * 2 == period:
+                await FallingEdge(self._dut.clk)
+            else:
+                await Timer(remainder - phase, units='ps')
+
+
+    # Without CLOCK_PERIOD_PS only multiples of half a cycle are possible, the current
+    #  phase is taken from the clock level (low means we are after the falling edge).
+    async def wait_cycles_edges(self, cycles: float) -> None:
+        halves = int(round(cycles * 2))
+        assert halves == cycles * 2, f"cycles={cycles} needs CLOCK_PERIOD_PS"
+        if halves > 0 and not self._dut.clk.value:
+            await RisingEdge(self._dut.clk)
+            halves -= 1
+        if halves >= 2:
+            await ClockCycles(self._dut.clk, int(halves / 2))
+        if halves % 2 != 0:
             await FallingEdge(self._dut.clk)
 
 
+    async def cycles_after_setup(self):
+        await self.wait_cycles(self.HALFBIT_PERIOD)
+
+
     async def cycles_after_hold(self):
-        if self.HALFEDGE:
-            await RisingEdge(self._dut.clk)
-        await ClockCycles(self._dut.clk, self.CYCLES_PER_HALFBIT)
+        await self.wait_cycles(self.HALFBIT_PERIOD)
 
 
     async def send_start(self):
@@ -161,20 +240,116 @@ class I2CController():
         await self.cycles_after_setup()
 
 
+    # Repeated-START (Sr) from the end of an ACK/NACK bit, SCL is high
+    async def send_repeated_start(self) -> None:
+        assert self.scl
+        self.set_sda_scl(True, False)	# SDA released while SCL low
+        await self.cycles_after_setup()
+
+        self.scl = True			# tSU;STA
+        await self.cycles_after_hold()
+
+        self.sda = False		# repeated-START condition
+        await self.cycles_after_hold()
+
+
+    # Send a list of I2CCommand chained with repeated-START, a single STOP at the end.
+    # verify(state: str) is awaited with 'HUNT' before each Sr (the DUT must have completed the
+    #  previous command) and 'RECV' after it, on_command(command) is called before each command.
+    # Returns a list with the bytes read for each command.
+    async def transaction(self, commands: list, verify = None, on_command = None, can_assert: bool = True) -> list:
+        assert len(commands) > 0
+        results = []
+        for i in range(len(commands)):
+            command = commands[i]
+            if on_command:
+                on_command(command)
+
+            if i == 0:
+                await self.send_start()
+            else:
+                if verify:
+                    await verify('HUNT')
+                await self.send_repeated_start()
+                if verify:
+                    await verify('RECV')
+
+            await self.send_data(command.cmd)
+            nack = await self.recv_ack(self.ACK, can_assert)
+            assert nack is self.ACK, f"transaction[{i}] cmd=0x{command.cmd:02x} NACK"
+
+            for v in command.write:
+                await self.send_data(v)
+                nack = await self.recv_ack(self.ACK, can_assert)
+                assert nack is self.ACK, f"transaction[{i}] cmd=0x{command.cmd:02x} data=0x{v:02x} NACK"
+
+            values = []
+            for pos in range(command.read):
+                values.append(await self.recv_data())
+                await self.send_acknack(self.ACK if pos != (command.read - 1) else self.NACK)
+            results.append(values)
+
+        assert await self.check_recv_is_idle()
+        await self.send_stop()
+        return results
+
+
     async def send_data(self, byte: int) -> None:
         for bitid in reversed(range(8)):
             m = 1 << bitid
             bf = True if((byte & m) != 0) else False
 
             self.set_sda_scl(bf, False)       # bitN
-            await ClockCycles(self._dut.clk, self.CYCLES_PER_HALFBIT)
-            if self.HALFEDGE:
-                await FallingEdge(self._dut.clk)
+            await self.cycles_after_setup()
 
             self.scl = True
-            if self.HALFEDGE:
-                await RisingEdge(self._dut.clk)
-            await ClockCycles(self._dut.clk, self.CYCLES_PER_HALFBIT)
+            await self.cycles_after_hold()
+
+
+    # Drive SCL to the opposite of its current state for 'cycles' of dut.clk then restore it.
+    # Both glitch edges are placed phase_ps after a rising edge of dut.clk, this allows the
+    #  SCL input conditioning (SCL_MODE) to be characterised against arrival phase.
+    async def send_scl_glitch(self, cycles: int, phase_ps: int = 0) -> None:
+        assert cycles > 0
+        assert phase_ps >= 0
+        scl = self.scl
+
+        await RisingEdge(self._dut.clk)
+        if phase_ps > 0:
+            await Timer(phase_ps, units='ps')
+        self.scl_raw = not scl		# glitch start
+
+        await ClockCycles(self._dut.clk, cycles)
+        if phase_ps > 0:
+            await Timer(phase_ps, units='ps')
+        self.scl_raw = scl		# glitch end
+
+
+    # Same as send_data() but a SCL glitch is injected in the middle of the SCL high
+    #  phase of glitch_bitid.  The bit timing is otherwise unchanged.
+    async def send_data_glitch(self, byte: int, glitch_bitid: int, cycles: int, phase_ps: int = 0) -> None:
+        assert glitch_bitid >= 0 and glitch_bitid <= 7
+        # At least one whole cycle is needed after the glitch for the filter to settle
+        assert cycles + 2 <= self.CYCLES_PER_HALFBIT, f"glitch cycles={cycles} does not fit in CYCLES_PER_HALFBIT={self.CYCLES_PER_HALFBIT}"
+
+        for bitid in reversed(range(8)):
+            m = 1 << bitid
+            bf = True if((byte & m) != 0) else False
+
+            self.set_sda_scl(bf, False)       # bitN
+            await self.cycles_after_setup()
+
+            self.scl = True
+            if bitid != glitch_bitid:
+                await self.cycles_after_hold()
+                continue
+
+            await self.wait_cycles(self.HALFBIT_PERIOD - self.CYCLES_PER_HALFBIT)
+            lead = int((self.CYCLES_PER_HALFBIT - cycles - 1) / 2)
+            if lead > 0:
+                await ClockCycles(self._dut.clk, lead)
+            await self.send_scl_glitch(cycles, phase_ps)	# consumes 1+cycles rising edges
+            await ClockCycles(self._dut.clk, self.CYCLES_PER_HALFBIT - lead - 1 - cycles)
 
 
     # no_pullup this disables any pullup interpretion of line state
@@ -198,17 +373,13 @@ class I2CController():
         # FIXME inject noise here (all 1 until last, all 0 until last, random until last,
         #  random for a bit, then all 1 until last - this seems realistic, noise during transition, then settle, then sample
         #  we would expect filtering to take effect
-        await ClockCycles(self._dut.clk, self.CYCLES_PER_HALFBIT)
-        if self.HALFEDGE:
-            await FallingEdge(self._dut.clk)
+        await self.cycles_after_setup()
 
         nack = self.sda_rx_resolve()
 
         self.scl = True
 
-        if self.HALFEDGE:
-            await RisingEdge(self._dut.clk)
-        await ClockCycles(self._dut.clk, self.CYCLES_PER_HALFBIT)
+        await self.cycles_after_hold()
 
         # Ok we try to perform a bit of a diagnostic as the ACK/NACK part seems an
         #  important thing and tricky to understand what the corrective action is
@@ -265,9 +436,7 @@ class I2CController():
             bit_mask = 1 << bitid
 
             self.set_sda_scl(None, False)       # idle SDA
-            await ClockCycles(self._dut.clk, self.CYCLES_PER_HALFBIT)
-            if self.HALFEDGE:
-                await FallingEdge(self._dut.clk)
+            await self.cycles_after_setup()
 
             self.scl = True
             ## FIXME check driver etc... perform diagnostic, reuse recv_nack() logic ?
@@ -275,9 +444,7 @@ class I2CController():
             if bit_value:
                 value |= bit_mask
 
-            if self.HALFEDGE:
-                await RisingEdge(self._dut.clk)
-            await ClockCycles(self._dut.clk, self.CYCLES_PER_HALFBIT)
+            await self.cycles_after_hold()
         return value
 
 
@@ -285,16 +452,13 @@ class I2CController():
         assert self.scl
 
         self.set_sda_scl(bit, False)
-        await ClockCycles(self._dut.clk, self.CYCLES_PER_HALFBIT)
-        if self.HALFEDGE:
-            await FallingEdge(self._dut.clk)
+        await self.cycles_after_setup()
 
         self.scl = True
-        if self.HALFEDGE:
-            await RisingEdge(self._dut.clk)
+        await self.wait_cycles(self.HALFBIT_PERIOD - self.CYCLES_PER_HALFBIT)
         if idle_exit:
             self.sda_idle()
-        await ClockCycles(self._dut.clk, self.CYCLES_PER_HALFBIT)
+        await self.wait_cycles(self.CYCLES_PER_HALFBIT)
 
 
     async def send_ack(self) -> None:
@@ -402,7 +566,7 @@ class I2CController():
         assert type(v) is bool or v is None
         self._scl_state = v if v is not None else self.PULLUP
         sda = self.sda_resolve()
-        self._sdascl.value = self.resolve_bits_state_str(sda, v)
+        self._drive(self.resolve_bits_state_str(sda, v))
 
 
     @property
@@ -415,7 +579,7 @@ class I2CController():
         assert type(v) is bool or v is None
         self._sda_state = v if v is not None else self.PULLUP
         scl = self.scl_resolve()
-        self._sdascl.value = self.resolve_bits_state_str(v, scl)
+        self._drive(self.resolve_bits_state_str(v, scl))
 
 
     @property
@@ -439,41 +603,22 @@ class I2CController():
         if v is not None:
             self.sda_raw = v
 
+    @property
+    def bus(self) -> BusResolver:
+        return self._bus
+
+
+    # DUT SDA output, an unresolved bit reads as released (pull-up), only open-drain allows that
     @property
     def sda_rx(self) -> bool:
-        if not self._sdascl_out.raw.value.is_resolvable:
-            #nv = False	# FIXME pickup RANDOM_POLICY
-            x = str(self._sdascl_out.raw.value)[-4:-2]	# "xxxx01xx" => "01" SDA SCL
-            my_sda = x[0]		# bit3 is 1st char
-            if my_sda == 'x':
-                # FIXME try insert here: assert not PUSH_PULL_MODE
-                assert not self._modeIsPP, f"PUSH_PULL_MODE={self._modeIsPP}"	# only open-drain allowed this fixup
-                nv = True	# FIXME is this open-drain mode ?
-                # FIXME is this warning old now? remove it ?
-                self._dut._log.warning(f"GL_TEST={self.GL_TEST} I2CController.sda_rx() = {str(self._sdascl_out.raw.value)} [IS_NOT_RESOLABLE maybe due to OPEN-DRAIN] x={x} my_sda={my_sda} using {nv}")
-                my_sda = '1'
-            assert my_sda == '0' or my_sda == '1', f"my_sda={str(self._sdascl_out.raw.value)}"
-            nv = True if my_sda == '1' else False
-            return nv
-        return self._sdascl_out.value & 2 != 0
+        assert not self._modeIsPP or not self._bus.unresolved(SDA_BITID_MASK), f"PUSH_PULL_MODE={self._modeIsPP} DUT SDA is unresolved"
+        return self._bus.dut_out(SDA_BITID_MASK)
 
 
+    # DUT SDA OE, an unresolved OE is not driving
     @property
     def sda_oe(self) -> bool:
-        if not self._sdascl_oe.raw.value.is_resolvable:
-            #nv = False	# FIXME pickup RANDOM_POLICY
-            x = str(self._sdascl_oe.raw.value)[-4:-2]	# "xxxx01xx" => "01" SDA SCL
-            my_sda_oe = x[0]		# bit3 is 1st char
-            if my_sda_oe == 'x':
-                assert False	# never happens ?  yes it does
-                nv = False	# FIXME is good default
-                # FIXME is this warning old now? remove it ?
-                self._dut._log.warning(f"GL_TEST={self.GL_TEST} I2CController.sda_oe() = {str(self._sdascl_oe.raw.value)} [IS_NOT_RESOLABLE] x={x} my_sda_oe={my_sda_oe} using {nv}")
-                my_sda_oe = '1'
-            assert my_sda_oe == '0' or my_sda_oe == '1', f"my_sda_oe={str(self._sdascl_oe.raw.value)}"
-            nv = True if my_sda_oe == '1' else False
-            return nv
-        return self._sdascl_oe.value & 2 != 0
+        return self._bus.dut_oe(SDA_BITID_MASK)
 
 
     def scl_resolve(self, v: bool = None, with_idle: bool = True) -> bool:
@@ -579,6 +724,37 @@ class I2CController():
         #v = self.resolve_bits_zerobased(sda, scl)
         v = self.resolve_bits_state_str(sda, scl)
         #print(f"resolve_bits_zerobased(sda={sda}, scl={scl}) = {v}")
-        self._sdascl.value = v
+        self._drive(v)
+
+
+    # All line writes come through here.  With jitter the commit to the pins is delayed by
+    #  a sub-cycle amount.  Writes made in the same timestep (or that would land at or before
+    #  a commit still pending) are merged into it, so the pins never show an intermediate
+    #  SDA/SCL combination that was not there without jitter and transitions keep their order.
+    def _drive(self, v: str) -> None:
+        if self._jitter is None:
+            self._sdascl.value = v
+            return
+
+        now = get_sim_time('ps')
+        at = now + self._jitter.sample()
+        if self._drive_pending is not None and (self._drive_origin_ps == now or at <= self._drive_commit_ps):
+            self._drive_pending[0] = v
+            return
+
+        at = max(at, self._drive_commit_ps)
+        pending = [v]
+        self._drive_pending = pending
+        self._drive_origin_ps = now
+        self._drive_commit_ps = at
+        cocotb.start_soon(self._drive_commit(pending, at - now))
+
+
+    async def _drive_commit(self, pending: list, delay_ps: int) -> None:
+        if delay_ps > 0:
+            await Timer(delay_ps, units='ps')
+        if self._drive_pending is pending:
+            self._drive_pending = None
+        self._sdascl.value = pending[0]
 
 
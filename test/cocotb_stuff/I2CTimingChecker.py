@@ -0,0 +1,214 @@
+#
+#
+#  I2C bus timing compliance, Standard-mode, Fast-mode and Fast-mode Plus.
+#
+#  Attaches to an I2CAnalyzer as a listener so it sees every resolved SCL/SDA edge (and
+#  which side drove it) without any extra wakeups.  Every interval measured is compared
+#  against the limits of all three modes (UM10204 Table 10), so one run shows which
+#  modes the bus traffic actually meets.  The debug() phase name is captured for the
+#  first violation of each parameter per mode.
+#
+#  Measured sim time is converted to seconds using the CLOCK_FREQUENCY the test runs
+#  dut.clk at, TARGET_FREQUENCY scales the result to another system clock (the DUT
+#  timing is all in dut.clk cycles).
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+from collections import namedtuple
+
+from cocotb_stuff.cocotbutil import *
+from cocotb_stuff.I2CAnalyzer import *
+
+
+I2CTimingViolation = namedtuple('I2CTimingViolation', 'mode param measured_ns limit_ns source phase time_ps')
+
+
+class I2CTimingChecker():
+    SM = 'Sm'
+    FM = 'Fm'
+    FMP = 'Fm+'
+
+    MODES = [SM, FM, FMP]
+
+    # UM10204 Table 10, all in ns.  tVD_DAT/tVD_ACK are maximums, everything else minimums.
+    #  tSCL is the SCL period from 1/fSCL
+    SPEC = {
+        SM:  {'tSCL': 10000, 'tHD_STA': 4000, 'tLOW': 4700, 'tHIGH': 4000, 'tSU_STA': 4700, 'tHD_DAT': 0, 'tSU_DAT': 250, 'tSU_STO': 4000, 'tBUF': 4700, 'tVD_DAT': 3450, 'tVD_ACK': 3450},
+        FM:  {'tSCL':  2500, 'tHD_STA':  600, 'tLOW': 1300, 'tHIGH':  600, 'tSU_STA':  600, 'tHD_DAT': 0, 'tSU_DAT': 100, 'tSU_STO':  600, 'tBUF': 1300, 'tVD_DAT':  900, 'tVD_ACK':  900},
+        FMP: {'tSCL':  1000, 'tHD_STA':  260, 'tLOW':  500, 'tHIGH':  260, 'tSU_STA':  260, 'tHD_DAT': 0, 'tSU_DAT':  50, 'tSU_STO':  260, 'tBUF':  500, 'tVD_DAT':  450, 'tVD_ACK':  450}
+    }
+
+    MAXIMUMS = ['tVD_DAT', 'tVD_ACK']
+
+    MODE_FREQUENCY = {SM: 100000, FM: 400000, FMP: 1000000}
+
+    def __init__(self, dut, CLOCK_FREQUENCY: int, TARGET_FREQUENCY: int = None, mode: str = None) -> None:
+        assert CLOCK_FREQUENCY > 0
+        assert mode is None or mode in self.MODES, f"mode={mode} is not one of {self.MODES}"
+        self._dut = dut
+        self.CLOCK_FREQUENCY = CLOCK_FREQUENCY
+        self.TARGET_FREQUENCY = TARGET_FREQUENCY if TARGET_FREQUENCY else CLOCK_FREQUENCY
+        # sim ps => target ns
+        self._scale = (CLOCK_FREQUENCY / self.TARGET_FREQUENCY) / 1000
+        self._mode = mode
+
+        self._counts = {}		# mode => param => violation count
+        self._first = {}		# mode => param => I2CTimingViolation
+        self._extreme = {}		# param => (measured_ns, source) smallest (or largest for MAXIMUMS)
+        for m in self.MODES:
+            self._counts[m] = {}
+            self._first[m] = {}
+
+        self._scl = '1'
+        self._sda = '1'
+        self._scl_rise_ps = None
+        self._scl_fall_ps = None
+        self._sda_change_ps = None	# SDA change in the current SCL low phase
+        self._start_ps = None		# START/Sr waiting for SCL to fall (tHD_STA)
+        self._stop_ps = None		# STOP waiting for the next START (tBUF)
+        self._high_has_condition = False
+        self._in_transaction = False
+        self._bitcount = 0
+        return None
+
+
+    @staticmethod
+    def mode_for_frequency(frequency: float) -> str:
+        for mode in I2CTimingChecker.MODES:
+            if frequency <= I2CTimingChecker.MODE_FREQUENCY[mode]:
+                return mode
+        return None
+
+
+    def attach(self, analyzer: I2CAnalyzer) -> None:
+        analyzer.add_listener(self.edge)
+
+
+    def edge(self, now: int, scl: str, sda: str, scl_changed: bool, sda_changed: bool, scl_source: str, sda_source: str) -> None:
+        if scl_changed and scl == '0':
+            self._scl_fall(now, scl_source)
+        if sda_changed:
+            if self._scl == '1' and not scl_changed:
+                if sda == '0':
+                    self._start(now, sda_source)
+                else:
+                    self._stop(now, sda_source)
+            else:
+                self._sda_change(now, sda_source)
+        if scl_changed and scl == '1':
+            self._scl_rise(now, scl_source)
+        self._scl = scl
+        self._sda = sda
+
+
+    def _scl_fall(self, now: int, source: str) -> None:
+        if self._start_ps is not None:
+            self.measure('tHD_STA', now - self._start_ps, source, now)
+            self._start_ps = None
+        elif self._scl_rise_ps is not None and self._in_transaction and not self._high_has_condition:
+            self.measure('tHIGH', now - self._scl_rise_ps, source, now)
+        self._scl_fall_ps = now
+        self._sda_change_ps = None
+        self._high_has_condition = False
+
+
+    def _scl_rise(self, now: int, source: str) -> None:
+        if self._in_transaction:
+            if self._scl_fall_ps is not None:
+                self.measure('tLOW', now - self._scl_fall_ps, source, now)
+            if self._sda_change_ps is not None:
+                self.measure('tSU_DAT', now - self._sda_change_ps, source, now)
+            if self._scl_rise_ps is not None and self._bitcount > 0:
+                self.measure('tSCL', now - self._scl_rise_ps, source, now)
+            self._bitcount += 1
+        self._scl_rise_ps = now
+
+
+    def _sda_change(self, now: int, source: str) -> None:
+        if self._scl_fall_ps is None or not self._in_transaction:
+            return
+        self.measure('tHD_DAT', now - self._scl_fall_ps, source, now)
+        if source == 'dut':
+            # data valid time, the 9th SCL low phase is the ACK slot
+            param = 'tVD_ACK' if self._bitcount % 9 == 8 else 'tVD_DAT'
+            self.measure(param, now - self._scl_fall_ps, source, now)
+        self._sda_change_ps = now
+
+
+    def _start(self, now: int, source: str) -> None:
+        if self._in_transaction:
+            if self._scl_rise_ps is not None:
+                self.measure('tSU_STA', now - self._scl_rise_ps, source, now)
+        elif self._stop_ps is not None:
+            self.measure('tBUF', now - self._stop_ps, source, now)
+        self._start_ps = now
+        self._stop_ps = None
+        self._in_transaction = True
+        self._high_has_condition = True
+        self._bitcount = 0
+
+
+    def _stop(self, now: int, source: str) -> None:
+        if self._in_transaction and self._scl_rise_ps is not None:
+            self.measure('tSU_STO', now - self._scl_rise_ps, source, now)
+        self._stop_ps = now
+        self._start_ps = None
+        self._in_transaction = False
+        self._high_has_condition = True
+
+
+    def measure(self, param: str, interval_ps: int, source: str, now: int) -> None:
+        ns = interval_ps * self._scale
+        is_max = param in self.MAXIMUMS
+
+        extreme = self._extreme.get(param)
+        if extreme is None or (ns > extreme[0] if is_max else ns < extreme[0]):
+            self._extreme[param] = (ns, source)
+
+        for mode in self.MODES:
+            limit = self.SPEC[mode][param]
+            if (ns > limit) if is_max else (ns < limit):
+                counts = self._counts[mode]
+                counts[param] = counts.get(param, 0) + 1
+                if param not in self._first[mode]:
+                    self._first[mode][param] = I2CTimingViolation(mode, param, ns, limit, source, debug_value(self._dut), now)
+
+
+    def violations(self, mode: str) -> int:
+        return sum(self._counts[mode].values())
+
+
+    def compliant_modes(self) -> list:
+        return list(filter(lambda m: self.violations(m) == 0, self.MODES))
+
+
+    def report(self) -> None:
+        self._dut._log.info(f"TIMING (CLOCK_FREQUENCY={self.CLOCK_FREQUENCY} TARGET_FREQUENCY={self.TARGET_FREQUENCY}) compliant={self.compliant_modes()}")
+        header = f"  {'param':8s} {'measured':>12s} {'by':4s}"
+        for mode in self.MODES:
+            header += f" {mode:>16s}"
+        self._dut._log.info(header)
+        for param in self.SPEC[self.SM].keys():
+            extreme = self._extreme.get(param)
+            if extreme is None:
+                continue
+            (ns, source) = extreme
+            line = f"  {param:8s} {ns:10.1f}ns {source:4s}"
+            for mode in self.MODES:
+                limit = self.SPEC[mode][param]
+                count = self._counts[mode].get(param, 0)
+                cmp = '<=' if param in self.MAXIMUMS else '>='
+                line += f" {cmp}{limit:<6d}{'ok' if count == 0 else f'x{count}':>8s}"
+            self._dut._log.info(line)
+        for mode in self.MODES if self._mode is None else [self._mode]:
+            for v in self._first[mode].values():
+                self._dut._log.info(f"  {mode:3s} {v.param} = {v.measured_ns:.1f}ns limit {v.limit_ns}ns by {v.source} at {v.time_ps}ps in {v.phase}")
+
+
+__all__ = [
+    'I2CTimingChecker',
+    'I2CTimingViolation'
+]
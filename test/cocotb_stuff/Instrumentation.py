@@ -0,0 +1,209 @@
+#
+#
+#  Opt-in counters of scheduler wakeups, trigger construction and handle .value reads and
+#  writes, per component and per debug() phase.
+#
+#  The component is taken from the coroutine that is running: the first part of its
+#  __qualname__, so I2CController.calibrate counts for I2CController, Monitor.run for
+#  Monitor, the test body for test_i2c_bert, 'sim' when no task is running (callbacks).
+#
+#  install() wraps:
+#   the scheduler coroutine resume (a wakeup) on top of scheduler_wakeups(),
+#   ClockCycles/RisingEdge/FallingEdge/Timer/Edge as bound in the cocotb_stuff and test_
+#    modules (construction count),
+#   the .value property of the cocotb handle classes (read = VPI get, write = VPI set).
+#    A write is charged to the task that assigns the handle, SignalAccessor writes
+#    are assigned from the task making them (I2CController, SignalOutput, the test body)
+#    so they are not all charged to SignalAccessor.  cocotb coalesces the assignments
+#    to a handle in a timestep, so writes can be more than the VPI writes made.
+#  uninstall() puts them all back.  Everything is slower while installed, it is for
+#  finding which component burns the wakeups not for timing.
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import sys
+
+import cocotb
+import cocotb.handle
+import cocotb.triggers
+
+from cocotb_stuff.cocotbutil import *
+
+
+class Instrumentation():
+    TRIGGERS = ['ClockCycles', 'RisingEdge', 'FallingEdge', 'Timer', 'Edge']
+
+    HANDLE_CLASSES = [
+        cocotb.handle.NonHierarchyObject,
+        cocotb.handle.NonHierarchyIndexableObject,
+        cocotb.handle.ConstantObject,
+        cocotb.handle.ModifiableObject,
+        cocotb.handle.RealObject,
+        cocotb.handle.EnumObject,
+        cocotb.handle.IntegerObject,
+        cocotb.handle.StringObject
+    ]
+
+    NO_PHASE = '(start)'
+    SIM = 'sim'
+
+    def __init__(self, dut, modules: list = None) -> None:
+        self._dut = dut
+        self._modules = modules		# module name prefixes to patch the triggers in
+        self._phase = self.NO_PHASE
+        self._counts = {}		# {phase: {component: {kind: count}}}
+        self._components = {}		# qualname => component
+        self._restore = []		# (obj, name, original) in install order
+        self._installed = False
+        return None
+
+
+    def _component(self, coro) -> str:
+        if coro is None:
+            return self.SIM
+        qualname = getattr(getattr(coro, '_coro', coro), '__qualname__', None)
+        if qualname is None:
+            return self.SIM
+        component = self._components.get(qualname)
+        if component is None:
+            component = qualname.split('.')[0]
+            self._components[qualname] = component
+        return component
+
+
+    def _count(self, kind: str, coro = None) -> None:
+        if coro is None:
+            coro = cocotb.scheduler._current_task if cocotb.scheduler is not None else None
+        phase = self._counts.get(self._phase)
+        if phase is None:
+            phase = {}
+            self._counts[self._phase] = phase
+        component = self._component(coro)
+        kinds = phase.get(component)
+        if kinds is None:
+            kinds = {}
+            phase[component] = kinds
+        kinds[kind] = kinds.get(kind, 0) + 1
+
+
+    def _on_debug(self, dut, marker: str) -> None:
+        self._phase = marker
+
+
+    def _patch(self, obj, name: str, value) -> None:
+        self._restore.append((obj, name, obj.__dict__.get(name)))	# None: was inherited, delete to restore
+        setattr(obj, name, value)
+
+
+    def _install_scheduler(self) -> None:
+        scheduler = cocotb.scheduler
+        if scheduler is None:
+            return
+        scheduler_wakeups()		# the base hook goes underneath ours
+        original = scheduler._schedule
+
+        def _schedule(coroutine, trigger=None):
+            self._count('wakeups', coroutine)
+            return original(coroutine, trigger)
+        self._patch(scheduler, '_schedule', _schedule)
+
+
+    def _trigger_factory(self, name: str, original):
+        def factory(*args, **kwargs):
+            self._count(name)
+            return original(*args, **kwargs)
+        return factory
+
+
+    def _install_triggers(self) -> None:
+        prefixes = self._modules if self._modules is not None else ['cocotb_stuff', 'test_']
+        for (module_name, module) in list(sys.modules.items()):
+            if module is None or not any(map(lambda p: module_name.startswith(p), prefixes)):
+                continue
+            for name in self.TRIGGERS:
+                original = getattr(cocotb.triggers, name)
+                if module.__dict__.get(name) is original:
+                    self._patch(module, name, self._trigger_factory(name, original))
+
+
+    def _install_handles(self) -> None:
+        for cls in self.HANDLE_CLASSES:
+            prop = cls.__dict__.get('value')
+            if not isinstance(prop, property):
+                continue
+            fget = prop.fget
+            fset = prop.fset
+
+            def getter(handle, fget=fget):
+                self._count('reads')
+                return fget(handle)
+
+            if fset is None:
+                self._patch(cls, 'value', property(getter, None, None, prop.__doc__))
+                continue
+
+            def setter(handle, value, fset=fset):
+                self._count('writes')
+                fset(handle, value)
+            self._patch(cls, 'value', property(getter, setter, None, prop.__doc__))
+
+
+    def install(self) -> None:
+        assert not self._installed
+        self._installed = True
+        debug_listen(self._on_debug)
+        self._install_scheduler()
+        self._install_triggers()
+        self._install_handles()
+        self._dut._log.info(f"Instrumentation installed ({len(self._restore)} hooks)")
+
+
+    def uninstall(self) -> None:
+        if not self._installed:
+            return
+        debug_unlisten(self._on_debug)
+        for (obj, name, original) in reversed(self._restore):
+            if original is None:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, original)
+        self._restore = []
+        self._installed = False
+
+
+    # {component: {kind: count}} over all phases
+    def by_component(self) -> dict:
+        totals = {}
+        for components in self._counts.values():
+            for (component, kinds) in components.items():
+                t = totals.setdefault(component, {})
+                for (kind, count) in kinds.items():
+                    t[kind] = t.get(kind, 0) + count
+        return totals
+
+
+    def to_dict(self) -> dict:
+        return {'components': self.by_component(), 'phases': self._counts}
+
+
+    def report(self) -> None:
+        kinds = ['wakeups', 'reads', 'writes'] + self.TRIGGERS
+        log = self._dut._log
+        totals = self.by_component()
+        log.info(f"Instrumentation components={len(totals)} phases={len(self._counts)}")
+        log.info("  {:24s} {}".format('component', ' '.join(map(lambda k: f"{k:>11s}", kinds))))
+        for (component, t) in sorted(totals.items(), key=lambda ct: ct[1].get('wakeups', 0), reverse=True):
+            log.info("  {:24s} {}".format(component, ' '.join(map(lambda k: f"{t.get(k, 0):11d}", kinds))))
+        for (phase, components) in self._counts.items():
+            wakeups = sum(map(lambda t: t.get('wakeups', 0), components.values()))
+            vpi = sum(map(lambda t: t.get('reads', 0) + t.get('writes', 0), components.values()))
+            top = max(components.items(), key=lambda ct: ct[1].get('wakeups', 0))[0] if len(components) > 0 else '-'
+            log.info(f"  phase {phase:32s} wakeups={wakeups} vpi={vpi} top={top}")
+
+
+__all__ = [
+    'Instrumentation'
+]
@@ -0,0 +1,73 @@
+#
+#
+#  Seeded sub-cycle delay source for I2CController line transitions.
+#
+#  Real SCL/SDA are asynchronous to dut.clk, offsetting every transition by a random
+#  picosecond amount lets the input synchronisers see arrivals inside their setup/hold
+#  window in simulation.
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import random
+
+
+class Jitter():
+    OFF = 'off'
+    UNIFORM = 'uniform'
+    NORMAL = 'normal'
+
+    DISTRIBUTIONS = [OFF, UNIFORM, NORMAL]
+
+    # max_ps is exclusive, the delay is always in the range 0 <= delay < max_ps
+    def __init__(self, max_ps: int, distribution: str = UNIFORM, seed: int = None) -> None:
+        assert type(max_ps) is int and max_ps >= 0, f"max_ps={max_ps} must be an int >= 0"
+        assert distribution in self.DISTRIBUTIONS, f"distribution={distribution} is not one of {self.DISTRIBUTIONS}"
+        self._max_ps = max_ps
+        self._distribution = distribution if max_ps > 0 else self.OFF
+        self._seed = seed
+        self._random = random.Random(seed)	# private stream, does not perturb the global random
+        self._count = 0
+        return None
+
+
+    @property
+    def enabled(self) -> bool:
+        return self._distribution != self.OFF
+
+
+    @property
+    def max_ps(self) -> int:
+        return self._max_ps
+
+
+    @property
+    def distribution(self) -> str:
+        return self._distribution
+
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+
+    def sample(self) -> int:
+        if self._distribution == self.OFF:
+            return 0
+        self._count += 1
+        if self._distribution == self.UNIFORM:
+            return self._random.randrange(self._max_ps)
+        # NORMAL: centred in the window, +/-3 sigma covers it, the tails are clipped
+        v = int(self._random.gauss(self._max_ps / 2, self._max_ps / 6))
+        return min(max(v, 0), self._max_ps - 1)
+
+
+    def __str__(self) -> str:
+        return f"Jitter(distribution={self._distribution}, max_ps={self._max_ps}, seed={self._seed})"
+
+
+__all__ = [
+    'Jitter'
+]
@@ -0,0 +1,182 @@
+#
+#
+#  DUT response latency, measured from the pins.
+#
+#  Listens to the I2CAnalyzer (attach()) so it costs no wakeups of its own: every resolved
+#  SCL/SDA change with the side (controller or DUT) that caused it.  For each SCL low phase
+#  in which the DUT changes SDA the time from the SCL falling edge to the last DUT change
+#  (SDA valid) is added to a histogram in dut.clk cycles:
+#   ACK/NACK  the ACK slot of a byte the DUT receives (the first byte and written bytes)
+#   DATA      the data bits of a byte the DUT transmits (after a first byte with R/W=1)
+#  so the DUT releasing SDA after its ACK of a written byte is not counted.
+#
+#  Only the edges are counted, keep_edges=N keeps the last N as (sim_time_ps, name,
+#  value, source) in edges for debugging.
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import math
+from collections import deque
+
+from cocotb_stuff import *
+from cocotb_stuff.I2CAnalyzer import *
+
+
+class LatencyMonitor():
+    ACK = 'ACK'
+    NACK = 'NACK'
+    DATA = 'DATA'
+
+    KINDS = [ACK, NACK, DATA]
+
+    # ACK slot after the 8 data bits of each byte, the R/W bit is the last bit of the first byte
+    SLOT_ACK = 8
+    SLOT_RW = 7
+
+    def __init__(self, dut, CLOCK_PERIOD_PS: int, label: dict = None, keep_edges: int = 0) -> None:
+        assert type(CLOCK_PERIOD_PS) is int and CLOCK_PERIOD_PS > 0
+        self._dut = dut
+        self.CLOCK_PERIOD_PS = CLOCK_PERIOD_PS
+        self._label = label if label is not None else {}
+
+        self._running = False
+
+        self._edge_count = 0
+        # (sim_time_ps, name, value, source) name: SCL SDA, value: '0' '1', source: 'ctrl' 'dut'
+        self._edges = deque(maxlen=keep_edges) if keep_edges > 0 else None
+        self._histogram = {}
+        for kind in self.KINDS:
+            self._histogram[kind] = {}
+
+        self._scl = '1'
+        self._sda = '1'
+
+        self._in_transaction = False
+        self._bitcount = 0
+        self._read = False			# R/W=1 in the first byte, the DUT transmits the bytes after it
+        self._fall_ps = None			# SCL falling edge of the current low phase
+        self._fall_sda = None			# SDA at that edge
+        self._change_ps = None			# last DUT SDA change in the current low phase
+        return None
+
+
+    def attach(self, analyzer: I2CAnalyzer) -> None:
+        assert not self._running
+        self._running = True
+        analyzer.add_listener(self.edge)
+
+
+    def shutdown(self) -> None:
+        self._running = False
+
+
+    def edge(self, now: int, scl: str, sda: str, scl_changed: bool, sda_changed: bool, scl_source: str, sda_source: str) -> None:
+        if not self._running:
+            return
+        if scl_changed:
+            self._scl = scl
+            self._edge_count += 1
+            if self._edges is not None:
+                self._edges.append((now, 'SCL', scl, scl_source))
+            if scl == '1':
+                self._scl_rise(now, sda)
+            else:
+                self._scl_fall(now, sda)
+        if sda_changed:
+            self._edge_count += 1
+            if self._edges is not None:
+                self._edges.append((now, 'SDA', sda, sda_source))
+            if self._scl == '1' and not scl_changed:
+                # START/repeated-START when SDA falls, STOP when it rises
+                self._in_transaction = sda == '0'
+                self._bitcount = 0
+                self._read = False
+                self._fall_ps = None
+            elif self._fall_ps is not None and sda_source == 'dut':
+                self._change_ps = now
+        self._sda = sda
+
+
+    def _scl_fall(self, now: int, sda: str) -> None:
+        if not self._in_transaction:
+            return
+        self._fall_ps = now
+        self._fall_sda = sda
+        self._change_ps = None
+
+
+    def _scl_rise(self, now: int, sda: str) -> None:
+        if not self._in_transaction:
+            return
+        slot = self._bitcount % 9
+        first = self._bitcount < 9
+        if self._fall_ps is not None and self._change_ps is not None:
+            kind = None
+            if slot == self.SLOT_ACK:
+                if first or not self._read:		# the DUT is the receiver of this byte
+                    kind = self.ACK if sda == '0' else self.NACK	# open-drain NACK is a release
+            elif not first and self._read and sda != self._fall_sda:
+                kind = self.DATA
+            if kind is not None:
+                self.add(kind, self._change_ps - self._fall_ps)
+        if first and slot == self.SLOT_RW:
+            self._read = sda == '1'
+        self._fall_ps = None
+        self._change_ps = None
+        self._bitcount += 1
+
+
+    def add(self, kind: str, latency_ps: int) -> None:
+        cycles = math.ceil(latency_ps / self.CLOCK_PERIOD_PS)
+        bucket = self._histogram[kind]
+        bucket[cycles] = bucket.get(cycles, 0) + 1
+
+
+    @property
+    def edge_count(self) -> int:
+        return self._edge_count
+
+
+    # The last keep_edges edges (empty when not kept)
+    @property
+    def edges(self) -> list:
+        return list(self._edges) if self._edges is not None else []
+
+
+    @property
+    def histogram(self) -> dict:
+        return self._histogram
+
+
+    def label_str(self) -> str:
+        return ' '.join(map(lambda kv: f"{kv[0]}={kv[1]}", self._label.items()))
+
+
+    def report(self) -> None:
+        self._dut._log.info(f"LATENCY {self.label_str()} (dut.clk cycles from SCL falling edge to DUT SDA valid, {self._edge_count} edges)")
+        for kind in self.KINDS:
+            bucket = self._histogram[kind]
+            if len(bucket) == 0:
+                self._dut._log.info(f"  {kind:4s}  -")
+                continue
+            count = sum(bucket.values())
+            mean = sum(map(lambda kv: kv[0] * kv[1], bucket.items())) / count
+            cells = '  '.join(map(lambda k: f"{k}:{bucket[k]}", sorted(bucket.keys())))
+            self._dut._log.info(f"  {kind:4s}  min={min(bucket.keys())} max={max(bucket.keys())} mean={mean:.2f} n={count}  {cells}")
+
+
+    def to_dict(self) -> dict:
+        return {
+            'label': dict(self._label),
+            'CLOCK_PERIOD_PS': self.CLOCK_PERIOD_PS,
+            # JSON keys are str
+            'histogram': dict(map(lambda kv: (kv[0], dict(map(lambda b: (str(b[0]), b[1]), sorted(kv[1].items())))), self._histogram.items()))
+        }
+
+
+__all__ = [
+    'LatencyMonitor'
+]
@@ -49,7 +49,7 @@ class Monitor():
         for prefix,signal_or_path in fsm_dict.items():
             signal = signal_or_path
             if isinstance(signal, str):
-                signal = SignalAccessor(self._dut, signal)
+                signal = SignalAccessor.get(self._dut, signal)
             if isinstance(signal, SignalAccessor):
                 accessor = signal
             else:
@@ -0,0 +1,195 @@
+#
+#
+#  Candidate signal index for ensure_resolvable() on gate-level runs.
+#
+#  ensure_resolvable() walks every design element of the flattened netlist, runs the
+#  filter on each and reads node.value several times per signal.  The list of candidate
+#  signals (ModifiableObject that pass the filter) only depends on the netlist, the filter
+#  patterns and the depth, so it is found once by a walk and saved to a JSON file keyed by
+#  the SHA-256 of those.  Later runs on the same netlist look the handles up by name
+#  directly (no walk, no filter).  If a cached name can not be found the cache is ignored
+#  and the walk done again.
+#
+#  ensure_resolvable() then applies the policy in one pass over the candidates: every
+#  value is read once, the new values computed and written, with a summary line
+#  (per-signal lines at debug level, including the signals the filter excluded).  Same
+#  policy rules as cocotbutil.ensure_resolvable.
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import os
+import re
+import sys
+import json
+import hashlib
+import logging
+
+import cocotb
+from cocotb.binary import BinaryValue
+
+from cocotb_stuff.cocotbutil import *
+from cocotb_stuff.cocotbutil import random_binary_value, random_merge_value
+
+
+class NetlistIndex():
+    VERSION = 2
+
+    _X_ONE = str.maketrans('x', '1')
+    _X_ZERO = str.maketrans('x', '0')
+
+    _UNRESOLVED_RE = re.compile('[^01]')
+
+    # netlist: gate_level_netlist.v (None or missing, the index is kept in memory only)
+    # filter: PathFilter (its patterns are part of the cache key) or None
+    def __init__(self, dut, netlist: str = None, filter: PathFilter = None, depth: int = None, cache_dir: str = None) -> None:
+        self._dut = dut
+        self._netlist = netlist
+        self._filter = filter
+        self._depth = depth if depth is not None else sys.maxsize
+        self._cache_dir = cache_dir
+
+        self._key = None
+        self._chains = None	# [[name, ...]] per candidate from dut
+        self._excluded = None	# [[name, ...]] per signal the filter excluded
+        self._handles = None
+        self._source = None	# 'cache' or 'walk'
+        self._filtered = 0
+        return None
+
+
+    @property
+    def key(self) -> str:
+        if self._key is None and self._netlist is not None and os.path.exists(self._netlist):
+            digest = hashlib.sha256()
+            with open(self._netlist, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            patterns = self._filter.patterns if self._filter is not None else []
+            digest.update(json.dumps([self.VERSION, self._depth, patterns]).encode('utf-8'))
+            self._key = digest.hexdigest()
+        return self._key
+
+
+    @property
+    def cache_file(self) -> str:
+        if self.key is None:
+            return None
+        cache_dir = self._cache_dir if self._cache_dir is not None else os.path.dirname(os.path.abspath(self._netlist))
+        return os.path.join(cache_dir, f".netlist_index.{self.key[:16]}.json")
+
+
+    def _walk(self, node, chain: list, depth: int) -> None:
+        for element in node:
+            if isinstance(element, cocotb.handle.ModifiableObject):
+                if self._filter is None or self._filter(element._path, element._name):
+                    self._chains.append(chain + [element._name])
+                    self._handles.append(element)
+                else:
+                    self._excluded.append(chain + [element._name])
+                    self._filtered += 1
+                    self._log_filtered(element)
+            elif isinstance(element, cocotb.handle.HierarchyObject) and depth > 0:
+                self._walk(element, chain + [element._name], depth - 1)
+
+
+    def _log_filtered(self, handle) -> None:
+        self._dut._log.debug(f"POLICY-RESOLVER {handle._path} = {str(handle.value)} (filtered)")
+
+
+    def _lookup(self, chains: list) -> list:
+        handles = []
+        for chain in chains:
+            node = self._dut
+            for name in chain:
+                node = node._id(name, extended=False)
+            handles.append(node)
+        return handles
+
+
+    def _load(self) -> bool:
+        filename = self.cache_file
+        if filename is None or not os.path.exists(filename):
+            return False
+        with open(filename, 'r') as f:
+            data = json.load(f)
+        if data.get('key') != self.key:
+            return False
+        try:
+            self._handles = self._lookup(data['chains'])
+        except (AttributeError, KeyError) as e:
+            self._dut._log.warning(f"NetlistIndex {filename} is stale, lookup failed ({e}), walking the design")
+            return False
+        self._chains = data['chains']
+        self._excluded = data['excluded']
+        self._filtered = data['filtered']
+        if self._dut._log.isEnabledFor(logging.DEBUG):
+            try:
+                for handle in self._lookup(self._excluded):
+                    self._log_filtered(handle)
+            except (AttributeError, KeyError):
+                pass		# only used for the log, the candidates were found
+        return True
+
+
+    def _save(self) -> None:
+        filename = self.cache_file
+        if filename is None:
+            return
+        with open(filename, 'w') as f:
+            json.dump({'key': self.key, 'netlist': self._netlist, 'filtered': self._filtered, 'chains': self._chains, 'excluded': self._excluded}, f)
+
+
+    # The candidate handles, from the cache or a walk (once)
+    @property
+    def handles(self) -> list:
+        if self._handles is None:
+            if self._load():
+                self._source = 'cache'
+            else:
+                self._chains = []
+                self._excluded = []
+                self._handles = []
+                self._filtered = 0
+                self._walk(self._dut, [], self._depth)
+                self._source = 'walk'
+                self._save()
+            self._dut._log.info(f"NetlistIndex candidates={len(self._handles)} filtered={self._filtered} from {self._source} {self.cache_file}")
+        return self._handles
+
+
+    # policy: True (x => 1), False (x => 0) or other (x => random from RANDOM_SEED and path)
+    def ensure_resolvable(self, policy = None) -> int:
+        seed = cocotb.RANDOM_SEED
+        self._dut._log.info(f"POLICY-RESOLVER policy={policy} seed={seed}")
+        handles = self.handles
+
+        values = list(map(lambda h: str(h.value), handles))
+        updates = []
+        for (handle, s) in zip(handles, values):
+            if self._UNRESOLVED_RE.search(s) is None:
+                continue
+            nbits = len(s)
+            if s == 'z' * nbits:
+                continue
+            if policy is True:
+                nstr = s.translate(self._X_ONE)
+            elif policy is False:
+                nstr = s.translate(self._X_ZERO)
+            else:
+                nstr = random_merge_value(s, random_binary_value(seed, handle._path, nbits))
+            updates.append((handle, nstr, s))
+
+        for (handle, nstr, s) in updates:
+            handle.value = BinaryValue(nstr, n_bits=len(nstr))
+            self._dut._log.debug(f"POLICY-RESOLVER {handle._path} = {nstr} (was {s})")
+
+        self._dut._log.info(f"POLICY-RESOLVER policy={policy} count={len(updates)} of {len(handles)} complete")
+        return len(updates)
+
+
+__all__ = [
+    'NetlistIndex'
+]
@@ -0,0 +1,122 @@
+#
+#
+#  Python profiler for a cocotb test run, selected with PROFILE=cprofile|sampling.
+#
+#  All the Python of a cocotb run (coroutines, triggers, callbacks) runs on the thread
+#  the simulator calls into, the one that start() is called from.
+#
+#  cprofile: cProfile enabled on that thread, stop() writes <base>.prof
+#   (python3 -m pstats <base>.prof, snakeviz, gprof2dot)
+#  sampling: a daemon thread takes the stack of that thread every interval and stop()
+#   writes <base>.collapsed, one 'frame;frame;frame count' line per distinct stack
+#   (flamegraph.pl, speedscope).  A sample with no Python frame on the thread is time in
+#   the simulator and is counted as '(simulator)'.
+#
+#  <base> is COCOTB_RESULTS_FILE (default results.xml) without the extension, so the
+#  profile is written next to the results.
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import os
+import sys
+import time
+import cProfile
+import threading
+
+
+class Profiler():
+    CPROFILE = 'cprofile'
+    SAMPLING = 'sampling'
+
+    MODES = [CPROFILE, SAMPLING]
+
+    SIMULATOR = '(simulator)'
+
+    def __init__(self, dut, mode: str, base: str = None, interval: float = 0.001) -> None:
+        assert mode in self.MODES, f"PROFILE={mode} is not one of {self.MODES}"
+        self._dut = dut
+        self._mode = mode
+        self._base = base if base is not None else self.results_base()
+        self._interval = interval
+
+        self._profile = None
+        self._thread = None
+        self._thread_id = None
+        self._stop = None
+        self._stacks = {}	# collapsed stack => samples
+        self._samples = 0
+        self._running = False
+        return None
+
+
+    @staticmethod
+    def results_base() -> str:
+        results = os.environ.get('COCOTB_RESULTS_FILE', 'results.xml')
+        return os.path.splitext(results)[0]
+
+
+    @property
+    def filename(self) -> str:
+        return self._base + ('.prof' if self._mode == self.CPROFILE else '.collapsed')
+
+
+    def start(self) -> None:
+        assert not self._running
+        self._running = True
+        if self._mode == self.CPROFILE:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._thread_id = threading.get_ident()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._sampler, name='Profiler', daemon=True)
+            self._thread.start()
+        self._dut._log.info(f"Profiler({self._mode}) started, writes {self.filename}")
+
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+    def _sampler(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                stack = self.SIMULATOR
+            else:
+                names = []
+                while frame is not None:
+                    names.append(self._frame_name(frame))
+                    frame = frame.f_back
+                stack = ';'.join(reversed(names))
+            self._stacks[stack] = self._stacks.get(stack, 0) + 1
+            self._samples += 1
+
+
+    def stop(self) -> str:
+        if not self._running:
+            return None
+        self._running = False
+        if self._mode == self.CPROFILE:
+            self._profile.disable()
+            self._profile.dump_stats(self.filename)
+        else:
+            self._stop.set()
+            self._thread.join()
+            with open(self.filename, 'w') as f:
+                for (stack, count) in sorted(self._stacks.items(), key=lambda sc: sc[1], reverse=True):
+                    f.write(f"{stack} {count}\n")
+            simulator = self._stacks.get(self.SIMULATOR, 0)
+            self._dut._log.info(f"Profiler({self._mode}) samples={self._samples} stacks={len(self._stacks)} simulator={simulator * 100 / max(self._samples, 1):.1f}%")
+        self._dut._log.info(f"Profiler({self._mode}) wrote {self.filename}")
+        return self.filename
+
+
+__all__ = [
+    'Profiler'
+]
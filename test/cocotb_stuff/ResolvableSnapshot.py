@@ -0,0 +1,167 @@
+#
+#
+#  Snapshot-and-diff of the design signals for the report_resolvable() checkpoints.
+#
+#  The hierarchy is walked once (same depth/filter rules as report_resolvable) and the
+#  handles of the signals kept, every checkpoint after that reads the values of that list
+#  into one column (a list of str, index is the signal).  The first checkpoint logs every
+#  signal, later ones log only the signals that changed since the previous checkpoint and
+#  those still not resolvable (any bit not 0/1), then a one line summary.
+#
+#  With a filename every column is also appended to a binary file, load() reads it back:
+#    b'RSNP' version:u32
+#    record: kind:u8 length:u32 payload   (little-endian)
+#      'P' paths     '\n' joined utf-8 (once, before the first 'S')
+#      'S' snapshot  sim_time_ps:u64 label_len:u16 label values ('\0' joined utf-8)
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import re
+import struct
+
+import cocotb
+from cocotb.utils import get_sim_time
+
+from cocotb_stuff.cocotbutil import *
+
+
+class ResolvableSnapshot():
+    MAGIC = b'RSNP'
+    VERSION = 1
+
+    _UNRESOLVED_RE = re.compile('[^01]')
+
+    def __init__(self, dut, depth: int = None, filter = None, filename: str = None) -> None:
+        self._dut = dut
+        self._depth = depth if depth is not None else 3		# report_resolvable() default
+        self._filter = filter
+        self._filename = filename
+        self._file = None
+
+        self._paths = None		# 'DUT.a.b' per signal, None until the first walk
+        self._handles = None
+        self._binary = None		# value is a BinaryValue (checked for x/z)
+        self._columns = []		# (label, sim_time_ps, [str])
+        return None
+
+
+    def _walk(self, node, pfx: str, depth: int) -> None:
+        for element in node:
+            if isinstance(element, cocotb.handle.HierarchyObject) and depth > 0:
+                self._walk(element, pfx + try_name(element) + '.', depth - 1)
+                continue
+            # past the depth limit a hierarchy is a path of its own, as report_resolvable logs it
+            if self._filter is not None and not self._filter(element._path, element._name):
+                continue
+            self._paths.append(pfx + try_name(element))
+            self._handles.append(element)
+            self._binary.append(isinstance(element, cocotb.handle.ModifiableObject))
+
+
+    # The filtered signal list, walked once
+    @property
+    def paths(self) -> list:
+        if self._paths is None:
+            self._paths = []
+            self._handles = []
+            self._binary = []
+            self._walk(self._dut, 'DUT.', self._depth)
+        return self._paths
+
+
+    def capture(self) -> list:
+        self.paths
+        return list(map(lambda h: str(try_value(h)), self._handles))
+
+
+    def is_resolvable(self, i: int, value: str) -> bool:
+        return not self._binary[i] or self._UNRESOLVED_RE.search(value) is None
+
+
+    def checkpoint(self, label: str) -> int:
+        values = self.capture()
+        now = get_sim_time('ps')
+        previous = self._columns[-1][2] if len(self._columns) > 0 else None
+        log = self._dut._log
+
+        changed = 0
+        unresolved = 0
+        for i in range(len(values)):
+            value = values[i]
+            resolvable = self.is_resolvable(i, value)
+            if not resolvable:
+                unresolved += 1
+            if previous is None:
+                log.info(f"{label} {self._paths[i]} = {value}")
+            elif previous[i] != value:
+                changed += 1
+                log.info(f"{label} {self._paths[i]} = {value} (was {previous[i]})")
+            elif not resolvable:
+                log.info(f"{label} {self._paths[i]} = {value} (unresolved)")
+
+        self._columns.append((label, now, values))
+        if self._filename:
+            self._write(label, now, values)
+
+        log.info(f"{label} ResolvableSnapshot signals={len(values)} changed={changed if previous is not None else '-'} unresolved={unresolved}")
+        return changed
+
+
+    def _record(self, kind: bytes, payload: bytes) -> None:
+        self._file.write(kind + struct.pack('<I', len(payload)) + payload)
+
+
+    def _write(self, label: str, now: int, values: list) -> None:
+        if self._file is None:
+            self._file = open(self._filename, 'wb')
+            self._file.write(self.MAGIC + struct.pack('<I', self.VERSION))
+            self._record(b'P', '\n'.join(self._paths).encode('utf-8'))
+        label_bytes = label.encode('utf-8')
+        payload = struct.pack('<QH', int(now), len(label_bytes)) + label_bytes + '\0'.join(values).encode('utf-8')
+        self._record(b'S', payload)
+        self._file.flush()
+
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+    @property
+    def columns(self) -> list:
+        return self._columns
+
+
+    # (paths, [(label, sim_time_ps, [str])]) from a file written by checkpoint()
+    @staticmethod
+    def load(filename: str) -> tuple:
+        paths = None
+        columns = []
+        with open(filename, 'rb') as f:
+            data = f.read()
+        assert data[0:4] == ResolvableSnapshot.MAGIC, f"{filename} is not a ResolvableSnapshot file"
+        (version,) = struct.unpack_from('<I', data, 4)
+        assert version == ResolvableSnapshot.VERSION, f"{filename} version {version} is not supported"
+        offset = 8
+        while offset < len(data):
+            kind = data[offset:offset+1]
+            (length,) = struct.unpack_from('<I', data, offset + 1)
+            payload = data[offset+5 : offset+5+length]
+            offset += 5 + length
+            if kind == b'P':
+                paths = payload.decode('utf-8').split('\n')
+            elif kind == b'S':
+                (now, label_len) = struct.unpack_from('<QH', payload, 0)
+                label = payload[10:10+label_len].decode('utf-8')
+                values = payload[10+label_len:].decode('utf-8').split('\0') if paths else []
+                columns.append((label, now, values))
+        return (paths, columns)
+
+
+__all__ = [
+    'ResolvableSnapshot'
+]
@@ -8,6 +8,8 @@
 # SPDX-License-Identifier: Apache2.0
 #
 #
+import functools
+
 import cocotb
 
 from .cocotbutil import *
@@ -25,11 +27,44 @@ from cocotb.utils import get_sim_time
 #  this clock cycle, performing a read-modify-write can only see the original value
 #  at the end of the simulation tick, not the separate modification we made.
 #
+# Reads go through a snapshot of the whole signal taken at most once per simulator
+#  callback (scheduler_reactions(), a value can only change between two of them: a new
+#  timestep, an Edge, a ReadWrite delta), all accessors registered on this SignalAccessor
+#  share it.  The sim time alone is not enough, the DUT updates uio_out/uio_oe in later
+#  deltas of the same timestep.  The snapshot is the value string, the accessors
+#  slice it and return a shared BinaryValue per distinct string (binary_value()), so
+#  a read makes no BinaryValue once the handful of values a pin takes have been seen.
+#  The integer value and X/Z mask (snapshot()) are parsed only when asked for.
+#
+# Writes from the accessors are spliced into the value last written (while it is still
+#  pending) or the snapshot, later writes win per bit, and every write assigns the result
+#  to the handle straight away, from the task that made it.  cocotb keeps only the last
+#  assignment per handle until its writes are applied (ReadWrite of the same timestep), so
+#  separate writers sharing one signal (SDA, SCL, power-on-sense, DIVISOR bits) do not
+#  lose each others updates and cost one VPI write.  The pending value is dropped once
+#  the handle has left the scheduler write queue.  Outside of a running simulator (no
+#  scheduler) the write is immediate.
 #
+# get(dut, path) returns the one shared instance per path for the dut, so every
+#  component (I2CController, BusResolver, Monitor, SignalOutput, the test body) shares
+#  the handle, the snapshot and the pending writes.  The registry lives for one test,
+#  release(dut) at the end of the test drops it (and a registry left over from a
+#  previous test is dropped on first use).
 #
 #
 # Like a wide-bus to a narrow-bus or bit
 class SignalAccessor():
+    # VPI operation counts across all instances, see counters()/totals()
+    _totals = {'reads': 0, 'writes': 0, 'hits': 0, 'deltas': 0}
+
+    # '1' => 1 everything else 0, then 'x'/'z' etc => 1 and 0/1 => 0
+    _ONES = str.maketrans('01xXzZuUwWlLhH-', '010000000000000')
+    _XZ = str.maketrans('01xXzZuUwWlLhH-', '001111111111111')
+
+    # Shared instances {id(dut): (dut, test, {path: SignalAccessor})}, see get()/release()
+    #  the dut is held so its id() can not be reused while registered
+    _registry = {}
+
     def __init__(self, dut, path: str, bitid: int = None, width: int = 1) -> None:
         assert dut is not None
         assert isinstance(path, str)
@@ -42,14 +77,22 @@ class SignalAccessor():
         self._bitid = bitid
         self._width = width
 
-        self._signal_update_list = []
-        self._signal_update_sim_time = get_sim_time
-
-        signal = design_element(dut, path)
+        shared = SignalAccessor._shared(dut).get(path)
+        signal = shared.raw if shared is not None else design_element(dut, path)
         if signal is None:
             raise Exception(f"Unable to find signal path: {path}")
         self._signal = signal
 
+        self._snapshot_time = None	# step_key() of the snapshot
+        self._snapshot_gen = 0		# incremented on every new snapshot
+        self._snapshot_str = None	# str(BinaryValue)
+        self._snapshot_ints = None	# (value, xz) parsed from _snapshot_str on demand
+        self._pending_str = None	# value written and not yet applied by the scheduler
+        self._reads = 0
+        self._writes = 0
+        self._hits = 0
+        self._deltas = 0
+
         # FIXME maybe for efficient can be optimize the 3 scenarios and generate a value(self)
         #   function and attach
         # 0: direct signal.value (no change)
@@ -68,33 +111,31 @@ class SignalAccessor():
             assert bitid >= 0 and bitid < 4096	# sanity check
             self._bitid = bitid
             self._width = 1
+            self._mask = 1 << bitid
             return None
 
 
+        # (value, xz) of this bit at bit0
+        @property
+        def bits(self) -> tuple:
+            (v, xz) = self._sa.snapshot()
+            return ((v >> self._bitid) & 1, (xz >> self._bitid) & 1)
+
+
+        # The BinaryValue is shared (see binary_value()), do not modify it
         @property
         def value(self):
             vstr = self._sa.signal_str()
-            ## isolate
-            bstr = vstr[-self._bitid-1]		# minus prefix due to bit0 on right hand side
-            print(f"SignalAccessor(label={self._label}, path={self.path}) = {vstr} => {self._bitid} for {bstr}")
-            v = BinaryValue(bstr, n_bits=len(bstr))
-            return v
+            return SignalAccessor.binary_value(vstr[-self._bitid-1])	# minus prefix due to bit0 on right hand side
 
 
         @value.setter
         def value(self, v: bool) -> None:
-            assert isinstance(v, bool) or isinstance(v, str)
             if isinstance(v, bool):
-                nv = '1' if (v) else '0'
-            else:
-                nv = v
-            assert len(nv) == 1
-            vstr = self._sa.signal_str()
-            ## isolate
-            nstr = vstr[0:-self._bitid-1] + nv + vstr[-self._bitid:]	# minus prefix due to bit0 on right hand side
-            print(f"vstr = {vstr}, bitid={self._bitid} nstr={nstr} left={vstr[0:-self._bitid-1]} right={vstr[-self._bitid:]} v={v}")
-            print(f"SignalAccessor(label={self._label}, path={self.path}) = {vstr} => {self._bitid} for {nstr}")
-            self._sa.signal_update(BinaryValue(nstr, n_bits=len(nstr)))
+                self._sa.write_str(self._bitid, '1' if v else '0')
+                return None
+            assert isinstance(v, str) and len(v) == 1
+            self._sa.write_str(self._bitid, v)
             return None
 
 
@@ -128,34 +169,37 @@ class SignalAccessor():
             assert last_bit >= first_bit
             self._width = last_bit - first_bit + 1
             assert self._width > 1
+            self._value_mask = (1 << self._width) - 1	# at bit0
+            self._mask = self._value_mask << first_bit	# in the signal
+            # int => str, small buses take the table
+            self._strs = tuple(map(lambda i: format(i, f"0{self._width}b"), range(1 << self._width))) if self._width <= 8 else None
             return None
 
 
+        # (value, xz) of this bus at bit0
+        @property
+        def bits(self) -> tuple:
+            (v, xz) = self._sa.snapshot()
+            return ((v >> self._first_bit) & self._value_mask, (xz >> self._first_bit) & self._value_mask)
+
+
+        # The BinaryValue is shared (see binary_value()), do not modify it
         @property
         def value(self):
             vstr = self._sa.signal_str()
-            ov = vstr[-self._last_bit-1 : -self._first_bit:]
-            bv = BinaryValue(ov, n_bits=self._width)
-            print(f"GET AccessorBus.value = {str(bv)} from BinaryValue({ov})")
-            ## isolate
-            print(f"SignalAccessor(label={self._label}, path={self.path}) = {vstr} => {self._last_bit}:{self._first_bit} for {bv}")
-            return bv
+            n = len(vstr)
+            return SignalAccessor.binary_value(vstr[n-self._last_bit-1 : n-self._first_bit])	# bit0 on right hand side
 
 
         @value.setter
         def value(self, v) -> None:
-            assert isinstance(v, int) or isinstance(v, str)
             if isinstance(v, str):
                 assert len(v) == self._width
-            if isinstance(v, int) or isinstance(v, str):
-                bv = BinaryValue(v, n_bits=self._width)
-                print(f"SET AccessorBus.value = {str(bv)}")
-                vstr = self._sa.signal_str()
-                ## isolate
-                nv = str(bv)
-                nstr = vstr[0:-self._last_bit-1] + nv + vstr[-self._first_bit:]
-                print(f"SignalAccessor(label={self._label}, path={self.path}) = {vstr} => {self._last_bit}:{self._first_bit} for {nstr} with {nv}")
-                self._sa.signal_update(BinaryValue(nstr, n_bits=len(nstr)))
+                self._sa.write_str(self._first_bit, v)
+                return None
+            assert isinstance(v, int)
+            assert (v & ~self._value_mask) == 0, f"value={v} does not fit width={self._width}"
+            self._sa.write_str(self._first_bit, self._strs[v] if self._strs is not None else format(v, f"0{self._width}b"))
             return None
 
 
@@ -175,18 +219,108 @@ class SignalAccessor():
 
 
     # Allow non-contigious bus patterns
+    # pattern: str over the signal with bit0 on the right hand side, '1' selects a bit
+    #  ('0' '.' '_' do not), or a list of bitid.  The selected bits are packed in order
+    #  from bit0 of the value.  Gather/scatter use a table of contiguous runs:
+    #  (signal_shift, run_mask, value_shift)
     class AccessorBusPattern():
-        def __init__(self, sa: 'SignalAccessor', label: str, pattern: str):
+        def __init__(self, sa: 'SignalAccessor', label: str, pattern):
             self._sa = sa
             self._label = label
+            if isinstance(pattern, str):
+                bitids = [len(pattern) - 1 - i for i in range(len(pattern)) if pattern[i] == '1']
+            else:
+                bitids = list(pattern)
+            bitids = sorted(set(bitids))
+            assert len(bitids) > 0, f"pattern={pattern} selects no bits"
+            self._bitids = bitids
+            self._bitids_msb = tuple(reversed(bitids))
+            self._width = len(bitids)
+            self._mask = sum(map(lambda b: 1 << b, bitids))
+
+            runs = []
+            value_shift = 0
+            start = bitids[0]
+            for i in range(1, len(bitids) + 1):
+                if i == len(bitids) or bitids[i] != bitids[i-1] + 1:
+                    width = bitids[i-1] - start + 1
+                    runs.append((start, (1 << width) - 1, value_shift))
+                    value_shift += width
+                    if i < len(bitids):
+                        start = bitids[i]
+            self._runs = tuple(runs)
+            self._cache_gen = None	# snapshot generation of _cache
+            self._cache = None
+            return None
+
+
+        def gather(self, signal_value: int) -> int:
+            v = 0
+            for (signal_shift, run_mask, value_shift) in self._runs:
+                v |= ((signal_value >> signal_shift) & run_mask) << value_shift
+            return v
+
+
+        def scatter(self, value: int) -> int:
+            v = 0
+            for (signal_shift, run_mask, value_shift) in self._runs:
+                v |= ((value >> value_shift) & run_mask) << signal_shift
+            return v
+
+
+        # (value, xz) of the selected bits packed from bit0
+        @property
+        def bits(self) -> tuple:
+            (v, xz) = self._sa.snapshot()
+            return (self.gather(v), self.gather(xz))
+
+
+        # The BinaryValue is shared (see binary_value()), do not modify it
+        @property
+        def value(self):
+            vstr = self._sa.signal_str()
+            if self._cache_gen == self._sa._snapshot_gen:
+                return self._cache
+            n = len(vstr)
+            bv = SignalAccessor.binary_value(''.join(map(lambda b: vstr[n-b-1], self._bitids_msb)))
+            self._cache_gen = self._sa._snapshot_gen
+            self._cache = bv
+            return bv
+
+
+        @value.setter
+        def value(self, v) -> None:
+            if isinstance(v, str):
+                assert len(v) == self._width
+                (_, value, z) = SignalAccessor.str_masks(v)
+                self._sa.write_masked(self._mask, self.scatter(value), self.scatter(z))
+                return None
+            assert isinstance(v, int)
+            assert (v >> self._width) == 0, f"value={v} does not fit width={self._width}"
+            self._sa.write_masked(self._mask, self.scatter(v))
             return None
 
 
+        @property
+        def width(self) -> int:
+            return self._width
+
+
         @property
         def accessor(self):
             return self._sa
 
 
+        @property
+        def raw(self):
+            return self._sa.raw
+
+
+        @property
+        def path(self) -> str:
+            return self._sa.path
+
+
     def register(self, label: str, first_bit: int, last_bit: int = -1):
         assert isinstance(label, str)
         if last_bit < 0:
@@ -202,37 +336,151 @@ class SignalAccessor():
             return self.AccessorBus(self, label, first_bit, last_bit)
 
 
-    def register_pattern(self, label: str, pattern: str):
+    def register_pattern(self, label: str, pattern):
         assert isinstance(label, str)
-        return AccessorBusPattern(self, label, pattern)
+        return self.AccessorBusPattern(self, label, pattern)
+
+
+    # The snapshot is current while this is unchanged, the simulator callback being run (the
+    #  sim time outside of a running simulator)
+    @staticmethod
+    def step_key() -> int:
+        if cocotb.scheduler is None:
+            return get_sim_time()
+        return scheduler_reactions()
+
+
+    # One VPI read per simulator callback, later calls in the same one are served from the snapshot
+    def _snapshot(self) -> None:
+        now = SignalAccessor.step_key()
+        if now == self._snapshot_time:
+            self._hits += 1
+            SignalAccessor._totals['hits'] += 1
+            return
+        self._read(now)
+
+
+    def _read(self, now: int) -> None:
+        self._reads += 1
+        SignalAccessor._totals['reads'] += 1
+        self._set_snapshot(now, str(self._signal.value))
+
+
+    def _set_snapshot(self, now: int, s: str) -> None:
+        self._snapshot_time = now
+        self._snapshot_gen += 1
+        self._snapshot_str = s
+        self._snapshot_ints = None
+
+
+    # (value, xz_mask) integers, a bit set in xz_mask is not 0/1 and is 0 in value
+    #  BinaryValue.integer/is_resolvable are slow, int(str, 2) fails fast on any x/z
+    def snapshot(self) -> tuple:
+        self._snapshot()
+        ints = self._snapshot_ints
+        if ints is None:
+            s = self._snapshot_str
+            if s.isdigit():
+                ints = (int(s, 2), 0)
+            else:
+                ints = (int(s.translate(self._ONES), 2), int(s.translate(self._XZ), 2))
+            self._snapshot_ints = ints
+        return ints
+
+
+    def invalidate(self) -> None:
+        self._snapshot_time = None
 
 
     def signal_str(self):
-        return str(self._signal.value)	## FIXME
+        self._snapshot()
+        return self._snapshot_str
+
+
+    # (mask, value, z_mask) for a str of '0'/'1'/'z' with bit0 on the right hand side,
+    #  placed at first_bit.  Writers use a handful of distinct strings, so the result is cached.
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def str_masks(s: str, first_bit: int = 0) -> tuple:
+        mask = 0
+        value = 0
+        z = 0
+        bit = 1 << (first_bit + len(s) - 1)
+        for c in s:
+            mask |= bit
+            if c == '1':
+                value |= bit
+            elif c == 'z' or c == 'Z':
+                z |= bit
+            else:
+                assert c == '0', f"unsupported write value '{c}' in {s}"
+            bit >>= 1
+        return (mask, value, z)
 
 
-    # The value probably need to be a before, after, delta-change
+    # A shared BinaryValue for a str of '0'/'1'/'x'/'z', the accessors return it from reads
+    #  and it is assigned to the handle on writes.  A pin only takes a handful of values so
+    #  after the first few no BinaryValue is made, do not modify the one returned.
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def binary_value(s: str) -> BinaryValue:
+        return BinaryValue(s, n_bits=len(s))
+
+
+    # An earlier write is still queued in the scheduler (not yet applied to the signal)
+    def _write_queued(self) -> bool:
+        scheduler = cocotb.scheduler
+        return scheduler is not None and self._signal in scheduler._write_calls
+
+
+    # The value to merge a write into, the last one written while it is still pending
+    def _write_base(self) -> str:
+        if self._pending_str is not None:
+            if self._write_queued():
+                self._deltas += 1	# merged with a write not yet applied
+                SignalAccessor._totals['deltas'] += 1
+                return self._pending_str
+            self._pending_str = None	# applied, the snapshot has it from the next callback
+        return self.signal_str()
+
+
+    # Write the str s ('0'/'1'/'z' bit0 on the right hand side) at first_bit
+    def write_str(self, first_bit: int, s: str) -> None:
+        base = self._write_base()
+        end = len(base) - first_bit
+        self._assign(base[:end-len(s)] + s + base[end:])
+
+
+    # Write the bits in mask, bits in z_mask are written as 'z'
+    def write_masked(self, mask: int, value: int, z_mask: int = 0) -> None:
+        chars = list(self._write_base())
+        n_bits = len(chars)
+        while mask:
+            m = mask & -mask	# lowest bit
+            mask ^= m
+            chars[n_bits - m.bit_length()] = 'z' if z_mask & m else ('1' if value & m else '0')	# bit0 on right hand side
+        self._assign(''.join(chars))
+
+
+    # One handle write of the whole value
+    def _assign(self, new_str: str) -> None:
+        self._signal.value = SignalAccessor.binary_value(new_str)
+        self._writes += 1
+        SignalAccessor._totals['writes'] += 1
+        if cocotb.scheduler is None:
+            # the handle has the value now, keep the snapshot current (_write_base() just took it)
+            self._set_snapshot(self._snapshot_time, new_str)
+        else:
+            self._pending_str = new_str
+
+
+    # Full width write
     def signal_update(self, value):
-        now = get_sim_time
-        # Get sim_time
-        # If we have a saved sim_time and it is not the same, invalidate changes
-        if self._signal_update_sim_time != now:
-            self._signal_update_list = []	# invalidate
-            # Store timestamp
-            self._signal_update_sim_time = now
-        # Store this state change
-        self._signal_update_list.append(value)	# FIXME
-        # Compute new composite value
-        new_value = str(self._signal.value)
-        for item in self._signal_update_list:
-            new_value = self.compute(new_value, item)
-        # Commit to signal
-        self._signal.value = value	## FIXME
-
-
-    def compute(self, value, item):
-        # FIXME need some magic here
-        return value
+        if isinstance(value, int):
+            n_bits = len(self.signal_str())
+            self.write_str(0, format(value, f"0{n_bits}b"))
+        else:
+            self.write_str(0, str(value))
 
 
     # Access full signal width, FIXME move this to subclass like others via auto-selection
@@ -251,16 +499,8 @@ class SignalAccessor():
     @value.setter
     def value(self, v: bool) -> None:
         assert isinstance(v, bool)
-        nv = '1' if (v) else '0'
-        vstr = self.signal_str()
-        ## isolate
-        if self._width == 1:
-            nstr = vstr[0:-self._bitid-1] + nv + vstr[-self._bitid:]	# minus prefix due to bit0 on right hand side
-            print(f"vstr = {vstr}, bitid={self._bitid} nstr={nstr} left={vstr[0:-self._bitid-1]} right={vstr[-self._bitid:]} v={v}")
-        else:
-            assert False, f"width = {self._width}"
-        print(f"SignalAccessor(label={self._label}, path={self.path}) = {vstr} => {self._bitid} for {nstr}")
-        self.signal_update(BinaryValue(nstr, n_bits=len(nstr)))
+        assert self._width == 1 and self._bitid is not None, f"width = {self._width}"
+        self.write_str(self._bitid, '1' if v else '0')
         return None
 
 
@@ -274,12 +514,64 @@ class SignalAccessor():
         return self._path
 
 
-    # sa_or_path: SignalAccessor|str
+    def counters(self) -> dict:
+        return {'reads': self._reads, 'writes': self._writes, 'hits': self._hits, 'deltas': self._deltas}
+
+
+    @staticmethod
+    def totals() -> dict:
+        return dict(SignalAccessor._totals)
+
+
+    # The test currently running, None outside of the regression manager
+    @staticmethod
+    def _current_test():
+        return getattr(cocotb.regression_manager, '_test', None)
+
+
+    # {path: SignalAccessor} registered for dut in this test
+    @staticmethod
+    def _shared(dut) -> dict:
+        entry = SignalAccessor._registry.get(id(dut))
+        if entry is None:
+            return {}
+        (_, test, paths) = entry
+        if test is not SignalAccessor._current_test():
+            SignalAccessor.release(dut)		# left over from an earlier test
+            return {}
+        return paths
+
+
+    # The shared instance for path, created (one design_element walk) on first use
+    @staticmethod
+    def get(dut, path: str) -> 'SignalAccessor':
+        paths = SignalAccessor._shared(dut)
+        sa = paths.get(path)
+        if sa is not None:
+            return sa
+        sa = SignalAccessor(dut, path)
+        if len(paths) == 0:
+            SignalAccessor._registry[id(dut)] = (dut, SignalAccessor._current_test(), paths)
+        paths[path] = sa
+        return sa
+
+
+    # Drop the shared instances of dut, returns the count released
+    @staticmethod
+    def release(dut) -> int:
+        entry = SignalAccessor._registry.pop(id(dut), None)
+        if entry is None:
+            return 0
+        return len(entry[2])
+
+
+    # sa_or_path: SignalAccessor|accessor from register()|str
     @staticmethod
-    def build(dut, sa_or_path) -> tuple:	# SignalAccessor, str
+    def build(dut, sa_or_path) -> tuple:	# SignalAccessor|accessor, str
+        sa = None
         if isinstance(sa_or_path, str):
-            sa = SignalAccessor(dut, sa_or_path)
-        if isinstance(sa_or_path, SignalAccessor):
+            sa = SignalAccessor.get(dut, sa_or_path)
+        if isinstance(sa_or_path, (SignalAccessor, SignalAccessor.AccessorBit, SignalAccessor.AccessorBus, SignalAccessor.AccessorBusPattern)):
             sa = sa_or_path
         assert sa is not None
 
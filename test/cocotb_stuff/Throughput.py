@@ -0,0 +1,93 @@
+#
+#
+#  Whole run simulation throughput, the figures the bench_regression.py gate compares.
+#
+#  Between start() and shutdown() the sim time, wall clock time, scheduler wakeups and
+#  the bytes the I2CAnalyzer decoded are recorded, to_dict() gives:
+#
+#   cycles_per_s     dut.clk cycles simulated per wall second (higher is better)
+#   bytes_per_s      I2C bytes transferred per wall second (higher is better)
+#   wakeups_per_bit  coroutine resumes per I2C bit on the bus, 9 per byte with the ACK
+#                    (lower is better, does not depend on the host speed)
+#
+#  The wall time includes the simulator, this is the end to end speed of a run.
+#
+#    THROUGHPUT = Throughput(dut, CLOCK_PERIOD_PS, ANALYZER)
+#    THROUGHPUT.start()
+#    ...
+#    THROUGHPUT.shutdown()
+#    THROUGHPUT.report()
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import time
+
+from cocotb.utils import get_sim_time
+
+from cocotb_stuff.cocotbutil import *
+
+
+class Throughput():
+    BITS_PER_BYTE = 9	# 8 data + ACK/NACK
+
+    def __init__(self, dut, CLOCK_PERIOD_PS: int, analyzer = None) -> None:
+        assert CLOCK_PERIOD_PS > 0, f"CLOCK_PERIOD_PS={CLOCK_PERIOD_PS}"
+        self._dut = dut
+        self._CLOCK_PERIOD_PS = CLOCK_PERIOD_PS
+        self._analyzer = analyzer
+        self._start = None	# (sim_time_ps, wall_time, wakeups, bytes)
+        self._end = None
+        return None
+
+
+    def _bytes(self) -> int:
+        if self._analyzer is None:
+            return 0
+        return self._analyzer.events.get('BYTE', 0)
+
+
+    def _now(self) -> tuple:
+        return (get_sim_time('ps'), time.perf_counter(), scheduler_wakeups(), self._bytes())
+
+
+    def start(self) -> None:
+        assert self._start is None
+        self._start = self._now()
+
+
+    def shutdown(self) -> None:
+        if self._start is None or self._end is not None:
+            return
+        self._end = self._now()
+
+
+    def to_dict(self) -> dict:
+        end = self._end if self._end is not None else self._now()
+        (sim_ps, wall, wakeups, nbytes) = map(lambda se: se[1] - se[0], zip(self._start, end))
+        cycles = sim_ps // self._CLOCK_PERIOD_PS
+        bits = nbytes * self.BITS_PER_BYTE
+        return {
+            'sim_ps': sim_ps,
+            'wall_s': wall,
+            'cycles': cycles,
+            'wakeups': wakeups,
+            'bytes': nbytes,
+            'bits': bits,
+            'cycles_per_s': cycles / wall if wall > 0 else 0,
+            'bytes_per_s': nbytes / wall if wall > 0 else 0,
+            'wakeups_per_bit': wakeups / bits if bits > 0 else 0
+        }
+
+
+    def report(self) -> None:
+        d = self.to_dict()
+        self._dut._log.info(f"THROUGHPUT cycles={d['cycles']} wall={d['wall_s']:.3f}s bytes={d['bytes']} wakeups={d['wakeups']}")
+        self._dut._log.info(f"  cycles/s={d['cycles_per_s']:.1f} bytes/s={d['bytes_per_s']:.2f} wakeups/bit={d['wakeups_per_bit']:.2f}")
+
+
+__all__ = [
+    'Throughput'
+]
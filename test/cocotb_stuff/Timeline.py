@@ -0,0 +1,115 @@
+#
+#
+#  Per-phase profile of a test from the debug() markers.
+#
+#  Every debug(dut, '200_SETDATA') marker starts a phase: the sim time, wall clock time
+#  and scheduler wakeups (coroutine resumes) are recorded, a phase ends at the next marker
+#  (or shutdown()).  report() logs a table of each phase's share of the sim time, wall
+#  time and wakeups so the test phases that cost the most Python time stand out, to_dict()
+#  is the same for JSON.
+#
+#    TIMELINE = Timeline(dut)
+#    TIMELINE.start()
+#    ...
+#    TIMELINE.shutdown()
+#    TIMELINE.report()
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import time
+
+from cocotb.utils import get_sim_time
+
+from cocotb_stuff.cocotbutil import *
+
+
+class Timeline():
+    START = '(start)'
+
+    def __init__(self, dut) -> None:
+        self._dut = dut
+        self._marks = []	# (marker, sim_time_ps, wall_time, wakeups) wakeups is the running total
+        self._end = None	# (sim_time_ps, wall_time, wakeups) at shutdown()
+        self._running = False
+        return None
+
+
+    def _now(self) -> tuple:
+        return (get_sim_time('ps'), time.perf_counter(), scheduler_wakeups())
+
+
+    def _on_debug(self, dut, marker: str) -> None:
+        if dut is self._dut:
+            self.mark(marker)
+
+
+    def start(self) -> None:
+        assert not self._running
+        self._running = True
+        self._end = None
+        debug_listen(self._on_debug)
+        self.mark(self.START)
+
+
+    def mark(self, marker: str) -> None:
+        (sim_ps, wall, wakeups) = self._now()
+        self._marks.append((marker, sim_ps, wall, wakeups))
+
+
+    def shutdown(self) -> None:
+        if not self._running:
+            return
+        debug_unlisten(self._on_debug)
+        self._end = self._now()
+        self._running = False
+
+
+    # [{'marker', 'sim_time_ps', 'sim_ps', 'wall_s', 'wakeups'}] per phase in order
+    def phases(self) -> list:
+        end = self._end if self._end is not None else self._now()
+        rows = []
+        for i in range(len(self._marks)):
+            (marker, sim_ps, wall, wakeups) = self._marks[i]
+            (next_sim_ps, next_wall, next_wakeups) = self._marks[i+1][1:] if i+1 < len(self._marks) else end
+            rows.append({
+                'marker': marker,
+                'sim_time_ps': sim_ps,
+                'sim_ps': next_sim_ps - sim_ps,
+                'wall_s': next_wall - wall,
+                'wakeups': next_wakeups - wakeups
+            })
+        return rows
+
+
+    def to_dict(self) -> dict:
+        rows = self.phases()
+        return {
+            'sim_ps': sum(map(lambda r: r['sim_ps'], rows)),
+            'wall_s': sum(map(lambda r: r['wall_s'], rows)),
+            'wakeups': sum(map(lambda r: r['wakeups'], rows)),
+            'phases': rows
+        }
+
+
+    def report(self, top: int = None) -> None:
+        d = self.to_dict()
+        total_sim = d['sim_ps'] if d['sim_ps'] > 0 else 1
+        total_wall = d['wall_s'] if d['wall_s'] > 0 else 1
+        total_wakeups = d['wakeups'] if d['wakeups'] > 0 else 1
+        log = self._dut._log
+        log.info(f"Timeline phases={len(d['phases'])} sim={d['sim_ps']/1e6:.3f}us wall={d['wall_s']:.3f}s wakeups={d['wakeups']}")
+        log.info(f"  {'marker':32s} {'sim us':>10s} {'sim%':>5s} {'wall s':>8s} {'wall%':>5s} {'wakeups':>9s} {'wake%':>5s} {'us/wake':>8s}")
+        rows = d['phases']
+        if top is not None:
+            rows = sorted(rows, key=lambda r: r['wall_s'], reverse=True)[:top]
+        for r in rows:
+            us_per_wakeup = r['wall_s'] * 1e6 / r['wakeups'] if r['wakeups'] > 0 else 0
+            log.info(f"  {r['marker']:32s} {r['sim_ps']/1e6:10.3f} {r['sim_ps']*100/total_sim:5.1f} {r['wall_s']:8.3f} {r['wall_s']*100/total_wall:5.1f} {r['wakeups']:9d} {r['wakeups']*100/total_wakeups:5.1f} {us_per_wakeup:8.1f}")
+
+
+__all__ = [
+    'Timeline'
+]
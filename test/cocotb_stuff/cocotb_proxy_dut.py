@@ -29,12 +29,16 @@
 #  Created by tomer filiba on Fri, 26 May 2006 (PSF)
 #
 #
+import os
 import re
 
 import cocotb
 from cocotb.handle import SimHandleBase, HierarchyObject, NonHierarchyObject
 from cocotb.simulator import INTEGER
 
+# PROXY_TRACE=true prints every DummyHandleObject attribute lookup
+PROXY_TRACE = os.environ.get('PROXY_TRACE', 'false').casefold() != 'false'
+
 
 class FakeHandle():
     _name = None
@@ -88,7 +92,8 @@ class DummyHandleObject(NonHierarchyObject):
 
     def __getattribute__(self, name):
         self_path = object.__getattribute__(self, "path")
-        print(f"DummyHandleObject.__getattribute__(path={self_path} name={name}) {type(name)}")
+        if PROXY_TRACE:
+            print(f"DummyHandleObject.__getattribute__(path={self_path} name={name}) {type(name)}")
         try:
             retval = object.__getattribute__(self, name)
         except AttributeError as exc:
@@ -8,6 +8,7 @@
 # SPDX-License-Identifier: Apache2.0
 #
 #
+import re
 import sys
 import hashlib
 
@@ -78,6 +79,45 @@ def try_value(v) -> str:
         return v.value
     return str(v)
 
+# filter(path, name) for report_resolvable()/ensure_resolvable(), returns False for a path
+#  matched by any of the exclude patterns.  The patterns are compiled as one alternation
+#  so each path costs one search(), and the verdict is memoised per path as the same
+#  signals are visited at every checkpoint.
+class PathFilter():
+    def __init__(self, patterns: list) -> None:
+        self._patterns = list(patterns)
+        self._re = re.compile('|'.join(map(lambda p: f"(?:{p})", self._patterns))) if len(self._patterns) > 0 else None
+        self._verdicts = {}	# path => bool
+        self._calls = 0
+        self._filtered = 0	# distinct paths excluded
+        return None
+
+
+    def __call__(self, path: str, name: str = None) -> bool:
+        self._calls += 1
+        verdict = self._verdicts.get(path)
+        if verdict is None:
+            verdict = self._re is None or self._re.search(path) is None
+            self._verdicts[path] = verdict
+            if not verdict:
+                self._filtered += 1
+        return verdict
+
+
+    @property
+    def patterns(self) -> list:
+        return self._patterns
+
+
+    @property
+    def filtered(self) -> int:
+        return self._filtered
+
+
+    def __str__(self) -> str:
+        return f"PathFilter(patterns={len(self._patterns)}, calls={self._calls}, paths={len(self._verdicts)}, filtered={self._filtered})"
+
+
 def report_resolvable(dut, pfx = None, node = None, depth = None, filter = None) -> None:
     if depth is None:
         depth = 3
@@ -124,56 +164,39 @@ def my_bin(value: int, size: int, pad_char = '0') -> str:
 # assert random_merge_value('0000xxxx0111x00x', '0101010101010101') == '0000010101110001'
 def random_merge_value(value: str, merge: str, merge_char: str = 'x') -> str:
     assert len(value) == len(merge), f"length mismatch {len(value)} != {len(merge)}"
-    s = ''
-    for i in range(0, len(value)):
-        ch = value[i]
-        if ch == merge_char:
-            ch = merge[i]
-        s += ch
-    #print("s={}".format(s))
-    return s
+    if merge_char not in value:
+        return value
+    return ''.join(map(lambda vm: vm[1] if vm[0] == merge_char else vm[0], zip(value, merge)))
 
 
-def random_binary_value(seed: int, path: str, nbits: int) -> BinaryValue:
+# Reproducible pseudo random bits of any width for (seed, path), bit0 is the first bit
+#  of the stream.  BLAKE2b in counter mode: the key is a digest of seed and path, each
+#  64 byte block is the keyed hash of the block number, so the width only decides how
+#  many blocks are made.  Not for cryptographic use, just repeatable per signal path.
+def random_bits(seed: int, path: str, nbits: int) -> int:
     assert isinstance(seed, int)
     assert isinstance(path, str)
-    # use digest to generate pseudo random bits ?
-    # use seed (binary value) + design hierachy path (string value)
-    # repeat a minimum number of times (4) to ensure/have-high-chance input data material is longer than digest length
-    # shift bits out of digest as necessary
-    # if we run out of bits (because the required data is longer than digest bit length,
-    #  repeat but use (5) times for input material
-    # no idea if this produces statistically useful randomness
-    #   with the input dataset expected and the total number of bits expected
-    #   but it looks random for now and is repeatible given same seed/same path
-    # maybe we are better not using a raw digest but a similar and more suited RNG generator
-
-    digest = hashlib.sha256()
-    # this is due to the limit bin(int_value) below
-    assert nbits >= 0 and nbits <= digest.digest_size*8, f"NOTIMPLEMENTED nbits out of range 0 to {digest.digest_size*8} at {nbits}"
-
-    key = bin(seed) + path
-    input = key * 4
-    ## Use path and seed to generate value
-    digest.update(input.encode(encoding='UTF-8'))
-
-    revdig = bytearray(digest.digest())
-    revdig.reverse()
-    #print("revdig={}".format(bytes(revdig).hex()))
-
-    nstr = ''
-    for i in list(map(bytes, zip(revdig))):
-        if len(nstr) >= nbits:
-            break
-        bb = my_bin(i[0], 8)
-        #print("Bbinstr={} {:02x}".format(bb, i[0]))
-        nstr = "{}".format(bb) + nstr	# prepend
-    #nstr = "{:032b}".format(binstr[-nbits:])
-
-    nstr = nstr[-nbits:]	# truncate
-
-    assert len(nstr) == nbits, f"{len(nstr)} != {nbits} for {nstr}"
-    return nstr
+    assert nbits >= 0, f"nbits out of range >= 0 at {nbits}"
+    if nbits == 0:
+        return 0
+
+    key = hashlib.blake2b(f"{seed}:{path}".encode('utf-8'), digest_size=32).digest()
+    keyed = hashlib.blake2b(key=key, digest_size=64)
+    nbytes = (nbits + 7) // 8
+    blocks = []
+    for counter in range((nbytes + 63) // 64):
+        h = keyed.copy()
+        h.update(counter.to_bytes(8, 'little'))
+        blocks.append(h.digest())
+    v = int.from_bytes(b''.join(blocks)[:nbytes], 'little')
+    return v & ((1 << nbits) - 1)
+
+
+# str of '0'/'1' of nbits with bit0 on the right hand side, see random_bits()
+def random_binary_value(seed: int, path: str, nbits: int) -> str:
+    if nbits == 0:
+        return ''
+    return format(random_bits(seed, path, nbits), f"0{nbits}b")
 
 
 def ensure_resolvable_apply(dut, policy, pfx: str, node) -> bool:
@@ -300,13 +323,75 @@ async def clockcycles_with_progress(dut,
         await ClockCycles(dut.clk, total_ticks)
 
 
+# Count of coroutine resumes (wakeups) by the cocotb scheduler, the hook is installed on
+#  the first call.  0 and no hook outside of a running simulator.
+_wakeups = [0]
+
+def scheduler_wakeups() -> int:
+    scheduler = cocotb.scheduler
+    if scheduler is None:
+        return 0
+    if '_schedule' not in scheduler.__dict__:
+        original = scheduler._schedule
+
+        def _schedule(coroutine, trigger=None):
+            _wakeups[0] += 1
+            return original(coroutine, trigger)
+        scheduler._schedule = _schedule
+    return _wakeups[0]
+
+
+# Count of simulator callbacks (GPI trigger reactions: a new timestep, Edge, ReadWrite delta
+#  ...) run by the cocotb scheduler, the hook is installed on the first call.  Signal values
+#  can only change between two reactions, so (with no pending writes of our own) a value
+#  read in the current reaction is still current.  0 and no hook outside of a running simulator.
+_reactions = [0]
+
+def scheduler_reactions() -> int:
+    scheduler = cocotb.scheduler
+    if scheduler is None:
+        return 0
+    if '_event_loop' not in scheduler.__dict__:
+        original = scheduler._event_loop
+
+        def _event_loop(trigger):
+            _reactions[0] += 1
+            return original(trigger)
+        scheduler._event_loop = _event_loop
+    return _reactions[0]
+
+
+# {(id(dut), ele_name): (dut, handle, n_bits)} the dut is held so its id() is not reused
+_debug_handles = {}
+
+# fn(dut, marker: str) called by debug() after the marker is written, see debug_listen()
+_debug_listeners = []
+
+def _debug_handle(dut, ele_name: str) -> tuple:
+    entry = _debug_handles.get((id(dut), ele_name))
+    if entry is None:
+        ele = design_element(dut, ele_name)
+        entry = (dut, ele, ele.value.n_bits if ele is not None else None)
+        _debug_handles[(id(dut), ele_name)] = entry
+    return (entry[1], entry[2])
+
+
+def debug_listen(fn: Callable) -> None:
+    if fn not in _debug_listeners:
+        _debug_listeners.append(fn)
+
+
+def debug_unlisten(fn: Callable) -> None:
+    if fn in _debug_listeners:
+        _debug_listeners.remove(fn)
+
+
 def debug(dut, value: str, ele_name='DEBUG', mode: int = 8) -> None:
     assert mode == 7 or mode == 8
-    ele = design_element(dut, ele_name)
+    (ele, bitlen) = _debug_handle(dut, ele_name)
     assert ele is not None, f"debug can not find signal: {ele_name}"
     #print("{}".format(str(ele.value)))
     #print("{}".format(ele.value.buff.decode('ascii')))
-    bitlen = ele.value.n_bits
     assert bitlen % mode == 0, f"signal {ele_name} is n_bits={bitlen} which is not modulus {mode} for ASCII"
     maxcharlen = int(bitlen / mode)
     assert mode == 8	## FIXME encode and pack 7bit ascii
@@ -317,6 +402,19 @@ def debug(dut, value: str, ele_name='DEBUG', mode: int = 8) -> None:
     #print("len={} {} {}".format(maxcharlen, type(asbytes), asbytes))
     ele.value = BinaryValue(asbytes)
     dut._log.debug("debug({})".format(value))
+    for fn in _debug_listeners:
+        fn(dut, value)
+
+
+# Read back the current debug() phase label, or None if the signal is not available
+def debug_value(dut, ele_name='DEBUG') -> str:
+    (ele, _) = _debug_handle(dut, ele_name)
+    if ele is None:
+        return None
+    value = ele.value
+    if not value.is_resolvable:
+        return None
+    return value.buff.decode('ascii', errors='replace').strip()
 
 
 
@@ -326,36 +424,29 @@ def default_mapper(s: str) -> bool:
 
 
 # BinaryValue can have Z and X states so sometime we just want to extract 1 bit
+# One index into the bit string (bit0 is at the right-hand-side), a new BinaryValue is
+#  only made when the bit really changes
 # TODO make a version for multiple bits/mask
 def binary_value_bit(bv: BinaryValue, bitid: int, value: Any = None, mapper: Callable[[str],bool] = None) -> bool:
     assert bitid >= 0
     assert isinstance(bv, BinaryValue)
 
     s = bv.binstr
-    biti = bitid+1 # 1-based index
-    if biti > bv.n_bits:
-        raise Exception(f"{biti} > {bv.n_bits} from {bv}")
-    # The minus characters are due to bit0 being at the right-hand-side
-    msb = s[:-(biti)]
-    lsb = s[-(biti-1):]
-    p = s[-(biti)]
-
-    dbg1 = "{} {} {}".format(s[-(biti+1)], s[-(biti)], s[-(biti-1)]) if(bv.n_bits > bitid+1) else "small={}".format(bv.n_bits)
-    dbg2 = "{} {} {} {}".format(dbg1, msb, p, lsb)
+    n_bits = len(s)
+    if bitid >= n_bits:
+        raise Exception(f"{bitid+1} > {n_bits} from {bv}")
+    i = n_bits - bitid - 1
+    p = s[i]
 
+    nv = bv
     if value is not None:
         if isinstance(value, bool):
             bitstr = '1' if(value) else '0'
         else:
             bitstr = str(value)
-        nvstr = msb + bitstr + lsb
-        #print("binary_value_bit {} {} {} {} SET {} {} => {}".format(value, bitid, s, dbg2, value, bitstr, nvstr))
-        assert len(s) == len(nvstr)
-        nv = BinaryValue(nvstr, n_bits=bv.n_bits)
-        assert nv.n_bits == bv.n_bits
-    else:
-        #print("binary_value_bit {} {} {} {} GET".format(value, bitid, s, dbg2))
-        nv = bv
+        assert len(bitstr) == 1
+        if bitstr != p:
+            nv = BinaryValue(s[:i] + bitstr + s[i+1:], n_bits=n_bits)
 
     if mapper:
         return (nv, mapper(p), p)
@@ -368,13 +459,13 @@ def extract_bit(v, bitid: int) -> bool:
     if isinstance(v, cocotb.handle.NonHierarchyObject):
         v = v.value
     assert isinstance(v, BinaryValue) or isinstance(v, int) or isinstance(v, bool), f"extract_bit() value not a supported type: {type(v)}"
-    if type(v) is int:
-        v = BinaryValue(v, n_bits=v.bit_length())
-    if type(v) is bool:
-        v = BinaryValue(v, n_bits=1)
+    if type(v) is int or type(v) is bool:
+        return ((v >> bitid) & 1) != 0
     if type(v) is BinaryValue:
-        (nbv, mv, sv) = binary_value_bit(v, bitid)
-        return mv
+        s = v.binstr
+        if bitid >= len(s):
+            raise Exception(f"{bitid+1} > {len(s)} from {v}")
+        return s[len(s) - bitid - 1] == '1'	# bit0 is at the right-hand-side
     raise Exception(f"type(v) is not a type we understand: {type(v)}")
 
 
@@ -383,6 +474,14 @@ def change_bit(signal, bitid: int, bf: bool) -> bool:
     assert isinstance(signal, cocotb.handle.ModifiableObject), f"{type(signal)} is not the expected type {type(cocotb.handle.ModifiableObject)}"
     v = signal.value
     if type(v) is BinaryValue:
+        s = v.binstr
+        if s.isdigit():		# binstr only has digits 0/1, so no X/Z: written back as an int
+            if bitid >= len(s):
+                raise Exception(f"{bitid+1} > {len(s)} from {v}")
+            iv = int(s, 2)
+            m = 1 << bitid
+            signal.value = (iv | m) if bf else (iv & ~m)
+            return (iv & m) != 0
         (nbv, mv, sv) = binary_value_bit(v, bitid, bf)
         signal.value = nbv
         return mv
@@ -406,6 +505,7 @@ __all__ = [
     'try_name',
     'try_path',
     'try_value',
+    'PathFilter',
     'report_resolvable',
     'ensure_resolvable_apply',
     'ensure_resolvable',
@@ -416,7 +516,13 @@ __all__ = [
 
     'clockcycles_with_progress',
 
+    'scheduler_wakeups',
+    'scheduler_reactions',
+
     'debug',
+    'debug_value',
+    'debug_listen',
+    'debug_unlisten',
 
     'extract_bit',
     'clear_bit',
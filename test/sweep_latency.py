@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+#
+#
+#  DUT response latency per SCL_MODE / DIVISOR.
+#
+#  Runs test_i2c_speed.py for every SCL_MODE x DIVISOR across a process pool and collates
+#  the LatencyMonitor histograms, in dut.clk cycles from the SCL falling edge to DUT SDA
+#  valid, for ACK and for read data.  This latency is what limits the achievable bit rate
+#  as SDA must be valid before the next SCL rising edge.
+#
+#  ./sweep_latency.py
+#  ./sweep_latency.py --scl-mode 0 --scl-mode 5 --cycles-per-bit 8 --json latency.json
+#  JITTER=uniform ./sweep_latency.py
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import sys
+import json
+import argparse
+
+from SweepRunner import *
+from test_i2c_bert import SCL_MODE_description, DIVISOR_description
+
+
+KINDS = ['ACK', 'DATA']
+
+
+def histogram_str(bucket: dict) -> str:
+    if not bucket:
+        return '-'
+    return ' '.join(map(lambda k: f"{k}:{bucket[k]}", sorted(bucket.keys(), key=int)))
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description='DUT response latency histogram per SCL_MODE / DIVISOR')
+    parser.add_argument('--scl-mode', type=int, action='append', help='SCL_MODE to run (default: all)')
+    parser.add_argument('--divisor', type=int, action='append', help='DIVISOR to run (default: all)')
+    parser.add_argument('--push-pull-mode', type=int, default=0, help='0=open-drain 1=push-pull')
+    parser.add_argument('--cycles-per-bit', type=float, default=25)
+    parser.add_argument('--jobs', type=int, default=None, help='process pool size (default: cpu count)')
+    parser.add_argument('--sim', default=None)
+    parser.add_argument('--gates', action='store_true')
+    parser.add_argument('--json', default=None, help='write the collated histograms to this file')
+    args = parser.parse_args(argv)
+
+    scl_modes = args.scl_mode if args.scl_mode else list(range(8))
+    divisors = args.divisor if args.divisor else list(range(4))
+
+    runner = SweepRunner('test_i2c_speed', sim=args.sim, gates=args.gates, max_workers=args.jobs)
+
+    print(f"Building in {runner.workdir} ...")
+    build = runner.build()
+    if build['returncode'] != 0:
+        print(f"Build failed, see {build['log']}")
+        return 1
+
+    points = []
+    for scl_mode in scl_modes:
+        for divisor in divisors:
+            env = {
+                'SCL_MODE': scl_mode,
+                'DIVISOR': divisor,
+                'PUSH_PULL_MODE': 'true' if args.push_pull_mode else 'false',
+                'CYCLES_PER_BIT': args.cycles_per_bit
+            }
+            points.append((f"latency_mode{scl_mode}_div{divisor}", env))
+
+    print(f"Running {len(points)} sweep points CYCLES_PER_BIT={args.cycles_per_bit} ...")
+    results = runner.run_all(points)
+
+    errors = 0
+    print()
+    print(f"DUT response latency (dut.clk cycles:count) SCL falling edge to SDA valid")
+    print(f"{'SCL_MODE':22s} {'DIVISOR':8s} {'ACK':24s} {'DATA':24s}")
+    for r in results:
+        scl_mode = r['env']['SCL_MODE']
+        divisor = r['env']['DIVISOR']
+        line = f"{f'{scl_mode} ({SCL_MODE_description(scl_mode)})':22s} {DIVISOR_description(divisor):8s}"
+        if not r['passed'] or r['result'] is None:
+            errors += 1
+            print(f"{line} FAIL see {r['log']}")
+            continue
+        histogram = r['result']['latency']['histogram']
+        for kind in KINDS:
+            line += f" {histogram_str(histogram.get(kind)):24s}"
+        print(line)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(list(map(lambda r: {'env': r['env'], 'passed': r['passed'], 'result': r['result']}, results)), f, indent=2)
+
+    return 1 if errors > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+#
+#
+#  Find the maximum working speed (lowest CYCLES_PER_BIT) for each combination of
+#  SCL_MODE / PUSH_PULL_MODE / DIVISOR.
+#
+#  Each combination is a binary search of CYCLES_PER_BIT using the short protocol
+#  subset in test_i2c_speed.py, the searches run concurrently across a process pool.
+#  The result is a speed table in SCLK for the system clocks reported in the exit
+#  summary of test_i2c_bert.py.
+#
+#  This assumes a CYCLES_PER_BIT that passes implies all larger values pass, the
+#  upper bound is confirmed first and combinations that fail it are reported as such.
+#
+#  ./sweep_max_speed.py
+#  ./sweep_max_speed.py --scl-mode 0 --scl-mode 5 --divisor 0 --jobs 8
+#  ./sweep_max_speed.py --granularity 1 --max-cycles-per-bit 32 --json speed.json
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from SweepRunner import *
+from test_i2c_bert import frequency_pretty, SCL_MODE_description, DIVISOR_description
+
+
+SYS_CLOCKS_MHZ = [10, 25, 50, 66]
+
+MIN_CYCLES_PER_BIT = 2	# see resolve_CYCLES_PER_BIT()
+
+
+def cycles_per_bit_str(cpb: float) -> str:
+    return str(int(cpb)) if float(cpb).is_integer() else str(cpb)
+
+
+# Must be module level to be picklable for the ProcessPoolExecutor
+def search(runner: SweepRunner, scl_mode: int, push_pull_mode: bool, divisor: int, lo: float, hi: float, granularity: float) -> dict:
+    label = f"mode{scl_mode}_pp{int(push_pull_mode)}_div{divisor}"
+    tried = {}
+
+    def probe(i: int) -> bool:
+        cpb = lo + i * granularity
+        env = {
+            'SCL_MODE': scl_mode,
+            'PUSH_PULL_MODE': 'true' if push_pull_mode else 'false',
+            'DIVISOR': divisor,
+            'CYCLES_PER_BIT': cycles_per_bit_str(cpb)
+        }
+        r = runner.run(f"{label}_cpb{cycles_per_bit_str(cpb)}", env)
+        tried[cycles_per_bit_str(cpb)] = r['passed']
+        return r['passed']
+
+    # index space lo..hi in steps of granularity
+    count = int(round((hi - lo) / granularity))
+    best = None
+    if probe(count):
+        best = count
+        (first, last) = (0, count - 1)
+        while first <= last:
+            mid = int((first + last) / 2)
+            if probe(mid):
+                best = mid
+                last = mid - 1
+            else:
+                first = mid + 1
+
+    return {
+        'SCL_MODE': scl_mode,
+        'PUSH_PULL_MODE': push_pull_mode,
+        'DIVISOR': divisor,
+        'CYCLES_PER_BIT': None if best is None else lo + best * granularity,
+        'tried': tried
+    }
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description='Maximum speed finder per SCL_MODE / PUSH_PULL_MODE / DIVISOR')
+    parser.add_argument('--scl-mode', type=int, action='append', help='SCL_MODE to search (default: all)')
+    parser.add_argument('--push-pull-mode', type=int, action='append', help='0=open-drain 1=push-pull (default: both)')
+    parser.add_argument('--divisor', type=int, action='append', help='DIVISOR to search (default: all)')
+    parser.add_argument('--min-cycles-per-bit', type=float, default=MIN_CYCLES_PER_BIT)
+    parser.add_argument('--max-cycles-per-bit', type=float, default=64)
+    parser.add_argument('--granularity', type=float, default=0.5, help='CYCLES_PER_BIT search step (1 or 0.5)')
+    parser.add_argument('--jobs', type=int, default=None, help='process pool size (default: cpu count)')
+    parser.add_argument('--sim', default=None)
+    parser.add_argument('--gates', action='store_true')
+    parser.add_argument('--json', default=None, help='write the speed table to this file')
+    args = parser.parse_args(argv)
+
+    assert args.granularity == 1.0 or args.granularity == 0.5, f"--granularity={args.granularity} must be 1 or 0.5"
+    assert args.min_cycles_per_bit >= MIN_CYCLES_PER_BIT
+
+    scl_modes = args.scl_mode if args.scl_mode else list(range(8))
+    push_pull_modes = list(map(bool, args.push_pull_mode)) if args.push_pull_mode else [False, True]
+    divisors = args.divisor if args.divisor else list(range(4))
+
+    runner = SweepRunner('test_i2c_speed', sim=args.sim, gates=args.gates)
+
+    print(f"Building in {runner.workdir} ...")
+    build = runner.build()
+    if build['returncode'] != 0:
+        print(f"Build failed, see {build['log']}")
+        return 1
+
+    combinations = []
+    for scl_mode in scl_modes:
+        for push_pull_mode in push_pull_modes:
+            for divisor in divisors:
+                combinations.append((scl_mode, push_pull_mode, divisor))
+
+    print(f"Searching {len(combinations)} combinations CYCLES_PER_BIT {args.min_cycles_per_bit}..{args.max_cycles_per_bit} step {args.granularity} ...")
+    results = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = []
+        for (scl_mode, push_pull_mode, divisor) in combinations:
+            futures.append(pool.submit(search, runner, scl_mode, push_pull_mode, divisor,
+                args.min_cycles_per_bit, args.max_cycles_per_bit, args.granularity))
+        for future in futures:
+            r = future.result()
+            cpb = '-' if r['CYCLES_PER_BIT'] is None else cycles_per_bit_str(r['CYCLES_PER_BIT'])
+            print(f"  SCL_MODE={r['SCL_MODE']} PUSH_PULL_MODE={r['PUSH_PULL_MODE']!s:5s} DIVISOR={r['DIVISOR']} => CYCLES_PER_BIT={cpb}  (tried {r['tried']})")
+            results.append(r)
+
+    print()
+    header = f"{'SCL_MODE':22s} {'PP':2s} {'DIVISOR':8s} {'CPB':>5s}"
+    for mhz in SYS_CLOCKS_MHZ:
+        header += f" {f'SYS_CLOCK {mhz} MHz':>16s}"
+    print(header)
+    for r in results:
+        scl_mode = r['SCL_MODE']
+        line = f"{f'{scl_mode} ({SCL_MODE_description(scl_mode)})':22s} {int(r['PUSH_PULL_MODE']):2d} {DIVISOR_description(r['DIVISOR']):8s}"
+        cpb = r['CYCLES_PER_BIT']
+        if cpb is None:
+            line += f" {'FAIL':>5s}"
+        else:
+            line += f" {cycles_per_bit_str(cpb):>5s}"
+            for mhz in SYS_CLOCKS_MHZ:
+                r.setdefault('SCLK', {})[mhz] = (mhz * 1000000) / cpb
+                line += f" {frequency_pretty(r['SCLK'][mhz]):>16s}"
+        print(line)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+#
+#
+#  Characterise what glitch width each SCL_MODE rejects.
+#
+#  Runs test_scl_glitch.py for every SCL_MODE x GLITCH_WIDTH x phase offset across a
+#  process pool and prints a glitch-width x SCL_MODE rejection table.  A cell shows
+#  how many of the phase offsets were rejected (the FSM did not miscount a bit).
+#
+#  ./sweep_scl_glitch.py
+#  ./sweep_scl_glitch.py --max-width 8 --phases 4 --jobs 16 --json glitch.json
+#  PUSH_PULL_MODE=true ./sweep_scl_glitch.py --scl-mode 1 --scl-mode 5
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import sys
+import json
+import argparse
+
+from SweepRunner import *
+from test_i2c_bert import SCL_MODE_description
+
+
+SCL_MODES = range(8)
+
+CLOCK_PERIOD_PS = 100000	# 10MHz as test_scl_glitch.py
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description='SCL glitch filter characterisation sweep')
+    parser.add_argument('--scl-mode', type=int, action='append', help='SCL_MODE to sweep (default: all)')
+    parser.add_argument('--max-width', type=int, default=6, help='widest glitch in dut.clk cycles')
+    parser.add_argument('--phases', type=int, default=4, help='number of phase offsets per clock period')
+    parser.add_argument('--cycles-per-bit', type=int, default=50)
+    parser.add_argument('--jobs', type=int, default=None, help='process pool size (default: cpu count)')
+    parser.add_argument('--sim', default=None)
+    parser.add_argument('--gates', action='store_true')
+    parser.add_argument('--json', default=None, help='write the collated results to this file')
+    args = parser.parse_args(argv)
+
+    scl_modes = args.scl_mode if args.scl_mode else list(SCL_MODES)
+    widths = range(1, args.max_width + 1)
+    phases = list(map(lambda i: int(i * CLOCK_PERIOD_PS / args.phases), range(args.phases)))
+
+    runner = SweepRunner('test_scl_glitch', sim=args.sim, gates=args.gates, max_workers=args.jobs)
+
+    print(f"Building in {runner.workdir} ...")
+    build = runner.build({'CYCLES_PER_BIT': args.cycles_per_bit})
+    if build['returncode'] != 0:
+        print(f"Build failed, see {build['log']}")
+        return 1
+
+    points = []
+    for scl_mode in scl_modes:
+        for width in widths:
+            for phase_ps in phases:
+                env = {
+                    'SCL_MODE': scl_mode,
+                    'CYCLES_PER_BIT': args.cycles_per_bit,
+                    'GLITCH_WIDTH': width,
+                    'GLITCH_PHASE_PS': phase_ps
+                }
+                points.append((f"mode{scl_mode}_w{width}_p{phase_ps}", env))
+
+    def progress(r: dict) -> None:
+        outcome = 'ERROR'
+        if r['result'] is not None:
+            outcome = 'MISCOUNT' if r['result']['miscount'] else 'REJECTED'
+        print(f"  {r['name']:24s} {outcome}")
+
+    print(f"Running {len(points)} sweep points ...")
+    results = runner.run_all(points, progress)
+
+    # table[width][scl_mode] = (rejected, total)
+    table = {}
+    errors = 0
+    for r in results:
+        width = r['env']['GLITCH_WIDTH']
+        scl_mode = r['env']['SCL_MODE']
+        (rejected, total) = table.setdefault(width, {}).get(scl_mode, (0, 0))
+        if r['result'] is None:
+            errors += 1
+            print(f"ERROR: {r['name']} produced no result, see {r['log']}")
+            continue
+        if not r['result']['miscount']:
+            rejected += 1
+        table[width][scl_mode] = (rejected, total + 1)
+
+    print()
+    print(f"Glitch rejection (rejected/phases) CYCLES_PER_BIT={args.cycles_per_bit}")
+    print('width  ' + ' '.join(map(lambda m: f"{m}:{SCL_MODE_description(m).split('-')[0]:>8s}", scl_modes)))
+    for width in widths:
+        cells = []
+        for scl_mode in scl_modes:
+            (rejected, total) = table.get(width, {}).get(scl_mode, (0, 0))
+            cells.append(f"{rejected:>5d}/{total:<4d}")
+        print(f"{width:5d}  " + ' '.join(cells))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'CYCLES_PER_BIT': args.cycles_per_bit,
+                'phases_ps': phases,
+                'points': list(map(lambda r: {'name': r['name'], 'env': r['env'], 'result': r['result']}, results))
+            }, f, indent=2)
+
+    return 1 if errors > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
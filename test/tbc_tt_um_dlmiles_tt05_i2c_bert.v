@@ -30,6 +30,7 @@ module tb_i2c_bert (
     reg [7:0] uio_in;
 
     initial begin
+`ifndef NO_VCD
         //$dumpfile ("tb_i2c_bert.vcd");
         $dumpfile ("tb.vcd");	// Renamed for GHA
 `ifdef GL_TEST
@@ -38,6 +39,7 @@ module tb_i2c_bert (
 `else
         $dumpvars (0, tb_i2c_bert);
 `endif
+`endif
 `ifdef TIMING
         #1;
 `endif
@@ -0,0 +1,118 @@
+#
+#
+#  ALU burst throughput, len4 = 0..15 (1..16 operand bytes per command).
+#
+#  Each length is run as a write burst (random operands, the op rotates through
+#  AND/OR/XOR/ADD) then a read burst of the same length, with the BertScoreboard
+#  predicting every byte read back.  The time from START to STOP of each command is
+#  converted to bus bit-times (BIT_PERIOD of dut.clk) to give the effective operand bytes
+#  per bit-time, 1/9 (0.111) is the limit with one ACK bit per byte and no command or
+#  START/STOP overhead.
+#
+#  The table is written to SWEEP_RESULT_FILE (JSON) when set.
+#
+#  make MODULE=test_alu_burst SCL_MODE=5 CYCLES_PER_BIT=8
+#
+#
+# SPDX-FileCopyrightText: Copyright 2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import os
+import json
+import random
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import ClockCycles
+from cocotb.utils import get_sim_time
+
+from cocotb_stuff import *
+from cocotb_stuff.cocotbutil import *
+from cocotb_stuff.cocotb_proxy_dut import *
+from cocotb_stuff.SignalAccessor import *
+from cocotb_stuff.I2CController import *
+from cocotb_stuff.Jitter import *
+from cocotb_stuff.BertClient import *
+from cocotb_stuff.BertScoreboard import *
+
+from test_i2c_bert import resolve_GL_TEST, resolve_PUSH_PULL_MODE, resolve_SCL_MODE, resolve_DIVISOR, resolve_CYCLES_PER_BIT, resolve_JITTER, SCL_MODE_description, DIVISOR_description, reset_with_config
+
+
+@cocotb.test()
+async def test_alu_burst(dut):
+    PUSH_PULL_MODE = resolve_PUSH_PULL_MODE(False)
+    SCL_MODE = resolve_SCL_MODE(0)
+    DIVISOR = resolve_DIVISOR(0)
+
+    CFG = resolve_CYCLES_PER_BIT(25)
+    CYCLES_PER_BIT      = CFG.CYCLES_PER_BIT
+    CYCLES_PER_HALFBIT  = CFG.CYCLES_PER_HALFBIT
+
+    dut._log.info(f"{CFG} SCL_MODE={SCL_MODE} ({SCL_MODE_description(SCL_MODE)}) PUSH_PULL_MODE={PUSH_PULL_MODE} DIVISOR={DIVISOR} ({DIVISOR_description(DIVISOR)})")
+
+    CLOCK_FREQUENCY = 10000000
+    CLOCK_PERIOD_NS = int(1 / (CLOCK_FREQUENCY * 1e-9))
+    CLOCK_PERIOD_PS = CLOCK_PERIOD_NS * 1000
+    clock = Clock(dut.clk, CLOCK_PERIOD_NS, units="ns")
+    cocotb.start_soon(clock.start())
+
+    GL_TEST = resolve_GL_TEST()
+    if GL_TEST:
+        dut = ProxyDut(dut)
+
+    await reset_with_config(dut, SCL_MODE, PUSH_PULL_MODE, 0, DIVISOR, CYCLES_PER_BIT, CYCLES_PER_HALFBIT)
+
+    # Off by default so the timing is repeatable
+    JITTER = resolve_JITTER(Jitter.OFF, CLOCK_PERIOD_PS)
+    ctrl = I2CController(dut, CYCLES_PER_BIT = CFG.BIT_PERIOD, pp = PUSH_PULL_MODE, GL_TEST = GL_TEST, CLOCK_PERIOD_PS = CLOCK_PERIOD_PS, jitter = JITTER)
+    ctrl.try_attach_debug_signals()
+    ctrl.initialize()
+    ctrl.idle()
+    await ClockCycles(dut.clk, CYCLES_PER_BIT*4)
+
+    # After rst_n the accumulator and LEN are zero, the bus idle is waited outside the timing
+    SCOREBOARD = BertScoreboard()
+    client = BertClient(ctrl, on_command = lambda c: debug(dut, c.label), idle_cycles = 0, scoreboard = SCOREBOARD)
+    rng = random.Random(cocotb.RANDOM_SEED)
+
+    BIT_TIME_PS = CFG.BIT_PERIOD * CLOCK_PERIOD_PS
+
+    async def timed(op: BertOp) -> float:
+        start_ps = get_sim_time('ps')
+        await client.run([op])
+        elapsed_ps = get_sim_time('ps') - start_ps
+        await ClockCycles(dut.clk, CYCLES_PER_BIT*4)
+        return elapsed_ps / BIT_TIME_PS
+
+    rows = []
+    for length in range(1, BertClient.ALU_MAX_LEN+1):
+        op = BertClient.ALU_OPS[(length - 1) % len(BertClient.ALU_OPS)]
+        operands = list(map(lambda _: rng.randrange(256), range(length)))
+
+        write_bits = await timed(client.op_alu(op, operands))
+        read_bits = await timed(client.op_alu(op, length, read=True))
+
+        rows.append({
+            'len4': length - 1,
+            'op': op,
+            'bytes': length,
+            'write_bits': write_bits,
+            'read_bits': read_bits,
+            'write_bytes_per_bit': length / write_bits,
+            'read_bytes_per_bit': length / read_bits
+        })
+
+    debug(dut, '999_DONE')
+
+    dut._log.info(f"ALU burst throughput (operand bytes per bus bit-time, limit 1/9 = {1/9:.3f}) {SCOREBOARD}")
+    dut._log.info(f"  {'len4':>4s} {'op':4s} {'bytes':>5s} {'write bits':>10s} {'B/bit':>6s} {'read bits':>10s} {'B/bit':>6s}")
+    for r in rows:
+        dut._log.info(f"  {r['len4']:4d} {r['op']:4s} {r['bytes']:5d} {r['write_bits']:10.1f} {r['write_bytes_per_bit']:6.3f} {r['read_bits']:10.1f} {r['read_bytes_per_bit']:6.3f}")
+    dut._log.info(f"  burst gain len4=15 over len4=0: write x{rows[-1]['write_bytes_per_bit'] / rows[0]['write_bytes_per_bit']:.2f} read x{rows[-1]['read_bytes_per_bit'] / rows[0]['read_bytes_per_bit']:.2f}")
+
+    if 'SWEEP_RESULT_FILE' in os.environ:
+        with open(os.environ['SWEEP_RESULT_FILE'], 'w') as f:
+            json.dump({'alu_burst': rows, 'BIT_PERIOD': CFG.BIT_PERIOD}, f, indent=2)
+
+    SignalAccessor.release(dut)
@@ -0,0 +1,108 @@
+#
+#
+#  Short protocol subset used by sweep_max_speed.py to probe if a CYCLES_PER_BIT works
+#  for a given SCL_MODE / PUSH_PULL_MODE / DIVISOR.  It covers the command, write data,
+#  read data and ACK paths but none of the slow timeout and stretch sections.
+#
+#  The DUT response latency histogram (LatencyMonitor) is written to SWEEP_RESULT_FILE
+#  (JSON) when set, sweep_latency.py collates it per SCL_MODE / DIVISOR.
+#
+#  make MODULE=test_i2c_speed SCL_MODE=5 CYCLES_PER_BIT=4
+#
+#
+# SPDX-FileCopyrightText: Copyright 2023-2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import os
+import json
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import ClockCycles
+
+from cocotb_stuff import *
+from cocotb_stuff.cocotbutil import *
+from cocotb_stuff.cocotb_proxy_dut import *
+from cocotb_stuff.SignalAccessor import *
+from cocotb_stuff.I2CController import *
+from cocotb_stuff.Jitter import *
+from cocotb_stuff.I2CAnalyzer import *
+from cocotb_stuff.LatencyMonitor import *
+from cocotb_stuff.BertClient import *
+
+from test_i2c_bert import resolve_GL_TEST, resolve_PUSH_PULL_MODE, resolve_SCL_MODE, resolve_DIVISOR, resolve_CYCLES_PER_BIT, resolve_JITTER, SCL_MODE_description, DIVISOR_description, reset_with_config
+
+
+@cocotb.test()
+async def test_i2c_speed(dut):
+    PUSH_PULL_MODE = resolve_PUSH_PULL_MODE(False)
+    SCL_MODE = resolve_SCL_MODE(0)
+    DIVISOR = resolve_DIVISOR(0)
+
+    CFG = resolve_CYCLES_PER_BIT(25)
+    CYCLES_PER_BIT      = CFG.CYCLES_PER_BIT
+    CYCLES_PER_HALFBIT  = CFG.CYCLES_PER_HALFBIT
+
+    dut._log.info(f"{CFG} SCL_MODE={SCL_MODE} ({SCL_MODE_description(SCL_MODE)}) PUSH_PULL_MODE={PUSH_PULL_MODE} DIVISOR={DIVISOR} ({DIVISOR_description(DIVISOR)})")
+
+    CLOCK_FREQUENCY = 10000000
+    CLOCK_PERIOD_NS = int(1 / (CLOCK_FREQUENCY * 1e-9))
+    clock = Clock(dut.clk, CLOCK_PERIOD_NS, units="ns")
+    cocotb.start_soon(clock.start())
+
+    GL_TEST = resolve_GL_TEST()
+    if GL_TEST:
+        dut = ProxyDut(dut)
+
+    await reset_with_config(dut, SCL_MODE, PUSH_PULL_MODE, 0, DIVISOR, CYCLES_PER_BIT, CYCLES_PER_HALFBIT)
+
+    # Off by default so the speed found is repeatable, JITTER=uniform to find a margin
+    JITTER = resolve_JITTER(Jitter.OFF, CLOCK_PERIOD_NS * 1000)
+    ctrl = I2CController(dut, CYCLES_PER_BIT = CFG.BIT_PERIOD, pp = PUSH_PULL_MODE, GL_TEST = GL_TEST, CLOCK_PERIOD_PS = CLOCK_PERIOD_NS * 1000, jitter = JITTER)
+    ctrl.try_attach_debug_signals()
+    ctrl.initialize()
+    ctrl.idle()
+    await ClockCycles(dut.clk, CYCLES_PER_BIT*4)
+
+    ANALYZER = I2CAnalyzer(dut)
+    ANALYZER.start()
+
+    LATENCY = LatencyMonitor(dut, CLOCK_PERIOD_NS * 1000, {
+        'SCL_MODE': SCL_MODE,
+        'PUSH_PULL_MODE': PUSH_PULL_MODE,
+        'DIVISOR': DIVISOR,
+        'CYCLES_PER_BIT': CFG.BIT_PERIOD
+    })
+    LATENCY.attach(ANALYZER)
+
+    client = BertClient(ctrl)
+
+    debug(dut, '100_GETCFG')
+    cfg = await client.get_cfg()
+    assert cfg.scl_mode == (SCL_MODE & 0x7) and cfg.push_pull == PUSH_PULL_MODE, f"GETCFG = 0x{cfg.raw:02x}"
+
+    debug(dut, '200_SETDATA')
+    await client.set_data(0x69)
+
+    debug(dut, '205_GETDATA')
+    data = await client.get_data()
+    assert data == 0x69, f"GETDATA = 0x{data:02x}"
+
+    debug(dut, '300_ALU_ADD')
+    await client.alu(BertClient.ALU_ADD, 0x03)
+
+    debug(dut, '310_GETSEND')
+    data = await client.get_send(2)
+    assert data == [0x69 + 0x03] * 2, f"GETSEND = {data}"
+
+    debug(dut, '999_DONE')
+
+    LATENCY.shutdown()
+    ANALYZER.shutdown()
+    LATENCY.report()
+    if 'SWEEP_RESULT_FILE' in os.environ:
+        with open(os.environ['SWEEP_RESULT_FILE'], 'w') as f:
+            json.dump({'latency': LATENCY.to_dict()}, f, indent=2)
+
+    SignalAccessor.release(dut)
@@ -0,0 +1,176 @@
+#
+#
+#  SCL glitch filter characterisation.
+#
+#  Each simulation run performs one reference GETCFG transaction and then the same
+#  transaction again with a glitch injected onto SCL during one data bit.  When the
+#  glitch is not rejected by the SCL input conditioning (SCL_MODE) the I2C FSM will
+#  count an extra bit, which is observed as a difference from the reference run.
+#
+#  This is not a pass/fail test, the outcome is written to SWEEP_RESULT_FILE (JSON)
+#  for sweep_scl_glitch.py to collate into a glitch-width x SCL_MODE table.
+#
+#  Interesting environment settings (in addition to those in test_i2c_bert.py):
+#
+#	GLITCH_WIDTH=1		Glitch width in dut.clk cycles
+#	GLITCH_PHASE_PS=0	Offset of glitch edges after the rising edge of dut.clk (ps)
+#	GLITCH_BITID=4		The data bit (7..0) the glitch is injected into
+#	SWEEP_RESULT_FILE=	Path to write JSON result
+#
+#  make MODULE=test_scl_glitch SCL_MODE=5 GLITCH_WIDTH=2
+#
+#
+# SPDX-FileCopyrightText: Copyright 2023-2024 Darryl Miles
+# SPDX-License-Identifier: Apache2.0
+#
+#
+import os
+import json
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import ClockCycles
+
+from cocotb_stuff import *
+from cocotb_stuff.cocotbutil import *
+from cocotb_stuff.cocotb_proxy_dut import *
+from cocotb_stuff.SignalAccessor import *
+from cocotb_stuff.I2CController import *
+
+from test_i2c_bert import FSM, resolve_GL_TEST, resolve_PUSH_PULL_MODE, resolve_SCL_MODE, resolve_DIVISOR, resolve_CYCLES_PER_BIT, SCL_MODE_description, reset_with_config
+
+
+GETCFG = 0xc1
+
+FSM_BITCOUNT_PATH = 'dut.i2c_bert.i2c.fsm_bitCount'
+
+
+def resolve_int(name: str, default_value: int) -> int:
+    v = default_value
+    if name in os.environ and os.environ[name].casefold() != 'default':
+        v = int(os.environ[name])
+    return v
+
+
+def fsm_bitcount(dut, GL_TEST: bool) -> str:
+    if GL_TEST:
+        return None
+    signal = design_element(dut, FSM_BITCOUNT_PATH)
+    if signal is None:
+        return None
+    return str(signal.value)
+
+
+# Run one GETCFG transaction and return the observations used for comparison
+async def glitch_probe(dut, ctrl: I2CController, GL_TEST: bool, glitch: tuple = None) -> dict:
+    await ctrl.send_start()
+
+    if glitch is None:
+        await ctrl.send_data(GETCFG)
+    else:
+        (bitid, cycles, phase_ps) = glitch
+        await ctrl.send_data_glitch(GETCFG, bitid, cycles, phase_ps)
+
+    # FSM view at the end of the 8th bit, a miscounted bit shows up here first
+    state_at_ack = None if GL_TEST else FSM.fsm_state(dut, 'i2c')
+    bitcount_at_ack = fsm_bitcount(dut, GL_TEST)
+
+    nack = await ctrl.recv_ack()
+    data = None
+    if nack is ctrl.ACK:
+        data = await ctrl.recv_data()
+        await ctrl.send_nack()
+
+    ctrl.sda_idle()
+    await ctrl.send_stop()
+    ctrl.idle()
+
+    returned_to_hunt = None
+    if not GL_TEST:
+        returned_to_hunt = await FSM.fsm_state_expected_within(dut, 'i2c', 'HUNT', ctrl.CYCLES_PER_BIT*4, can_raise=False)
+
+    await ClockCycles(dut.clk, ctrl.CYCLES_PER_BIT*4)
+
+    return {
+        'state_at_ack': state_at_ack,
+        'bitcount_at_ack': bitcount_at_ack,
+        'nack': nack,
+        'data': data,
+        'returned_to_hunt': returned_to_hunt
+    }
+
+
+@cocotb.test()
+async def test_scl_glitch(dut):
+    PUSH_PULL_MODE = resolve_PUSH_PULL_MODE(False)
+    SCL_MODE = resolve_SCL_MODE(0)
+    DIVISOR = resolve_DIVISOR(0)
+    GLITCH_WIDTH = resolve_int('GLITCH_WIDTH', 1)
+    GLITCH_PHASE_PS = resolve_int('GLITCH_PHASE_PS', 0)
+    GLITCH_BITID = resolve_int('GLITCH_BITID', 4)
+
+    # Needs to be wide enough to fit the widest glitch inside the SCL high phase
+    CFG = resolve_CYCLES_PER_BIT(50)
+    CYCLES_PER_BIT      = CFG.CYCLES_PER_BIT
+    CYCLES_PER_HALFBIT  = CFG.CYCLES_PER_HALFBIT
+
+    CLOCK_FREQUENCY = 10000000
+    CLOCK_PERIOD_NS = int(1 / (CLOCK_FREQUENCY * 1e-9))
+    assert GLITCH_PHASE_PS < CLOCK_PERIOD_NS * 1000, f"GLITCH_PHASE_PS={GLITCH_PHASE_PS} must be less than the clock period"
+
+    dut._log.info(f"{CFG} SCL_MODE={SCL_MODE} ({SCL_MODE_description(SCL_MODE)}) GLITCH_WIDTH={GLITCH_WIDTH} GLITCH_PHASE_PS={GLITCH_PHASE_PS} GLITCH_BITID={GLITCH_BITID}")
+
+    clock = Clock(dut.clk, CLOCK_PERIOD_NS, units="ns")
+    cocotb.start_soon(clock.start())
+
+    GL_TEST = resolve_GL_TEST()
+    if GL_TEST:
+        dut = ProxyDut(dut)
+
+    await reset_with_config(dut, SCL_MODE, PUSH_PULL_MODE, 0, DIVISOR, CYCLES_PER_BIT, CYCLES_PER_HALFBIT)
+
+    debug(dut, '001_GLITCH')
+
+    # No jitter, the glitch width and phase are the variables being characterised
+    ctrl = I2CController(dut, CYCLES_PER_BIT = CFG.BIT_PERIOD, pp = PUSH_PULL_MODE, GL_TEST = GL_TEST, CLOCK_PERIOD_PS = CLOCK_PERIOD_NS * 1000)
+    ctrl.try_attach_debug_signals()
+    ctrl.initialize()
+    ctrl.idle()
+    await ClockCycles(dut.clk, CYCLES_PER_BIT*4)
+
+    debug(dut, '010_REFERENCE')
+    reference = await glitch_probe(dut, ctrl, GL_TEST)
+    dut._log.info(f"REFERENCE = {reference}")
+
+    # The reference must be a good transaction or the comparison has no meaning
+    assert reference['nack'] is ctrl.ACK, f"reference transaction failed: {reference}"
+    expected_cfg = (SCL_MODE & 0x7) | (0x08 if PUSH_PULL_MODE else 0x00)
+    assert reference['data'] == expected_cfg, f"reference transaction failed: {reference}"
+
+    debug(dut, f"020_GLITCH_W{GLITCH_WIDTH}_P{GLITCH_PHASE_PS}")
+    glitched = await glitch_probe(dut, ctrl, GL_TEST, (GLITCH_BITID, GLITCH_WIDTH, GLITCH_PHASE_PS))
+    dut._log.info(f"GLITCHED  = {glitched}")
+
+    miscount = glitched != reference
+    dut._log.info(f"SCL_MODE={SCL_MODE} ({SCL_MODE_description(SCL_MODE)}) GLITCH_WIDTH={GLITCH_WIDTH} GLITCH_PHASE_PS={GLITCH_PHASE_PS} => {'MISCOUNT' if miscount else 'REJECTED'}")
+
+    if 'SWEEP_RESULT_FILE' in os.environ:
+        result = {
+            'SCL_MODE': SCL_MODE,
+            'PUSH_PULL_MODE': PUSH_PULL_MODE,
+            'DIVISOR': DIVISOR,
+            'CYCLES_PER_BIT': CYCLES_PER_BIT,
+            'GLITCH_WIDTH': GLITCH_WIDTH,
+            'GLITCH_PHASE_PS': GLITCH_PHASE_PS,
+            'GLITCH_BITID': GLITCH_BITID,
+            'GL_TEST': GL_TEST,
+            'miscount': miscount,
+            'reference': reference,
+            'glitched': glitched
+        }
+        with open(os.environ['SWEEP_RESULT_FILE'], 'w') as f:
+            json.dump(result, f, indent=2)
+
+    debug(dut, '999_DONE')
+
+    SignalAccessor.release(dut)